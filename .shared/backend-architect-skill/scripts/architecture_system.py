@@ -13,12 +13,13 @@ Usage:
     result = generate_architecture_system("e-commerce platform", "MyProject", persist=True, service="payment")
 """
 
-import csv
 import json
 import os
-from datetime import datetime
+import threading
+import weakref
 from pathlib import Path
-from core import search, DATA_DIR
+from core import (search, load_rows, index_generations, publish_shared_index, attach_shared_index,
+                  KeywordAutomaton)
 
 
 # ============ CONFIGURATION ============
@@ -33,57 +34,269 @@ SEARCH_CONFIG = {
     "platform": {"max_results": 2}
 }
 
+# Concurrency for independent domain lookups. "serial" (default) is fastest on the
+# shipped corpus: BM25 scoring is pure Python, so threads only overlap where the
+# GIL is released (the NumPy engine, free-threaded builds). "process" spreads
+# CPU-bound scoring of large corpora across cores, with every worker mapping one
+# shared copy of the indexes (see core.publish_shared_index).
+# BACKEND_ARCHITECT_WORKERS=1 runs lookups serially whatever the executor.
+EXECUTOR = os.environ.get("BACKEND_ARCHITECT_EXECUTOR", "serial")
+MAX_WORKERS = int(os.environ.get("BACKEND_ARCHITECT_WORKERS", "0")) or None
+
+
+def _take(search_result: dict, max_results: int) -> dict:
+    """Copy of a search result limited to its first max_results rows."""
+    if "results" not in search_result or len(search_result["results"]) <= max_results:
+        return search_result
+    results = search_result["results"][:max_results]
+    return {**search_result, "count": len(results), "results": results}
+
+
+# ============ WORKER POOL ============
+class _WorkerPool:
+    """Thread or process pool kept across generate() calls.
+
+    Process workers map one published shared index; the file is republished (and
+    the pool restarted) only when an index generation changes, so repeated calls
+    pay neither the publish nor the spawn.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._shared = None
+        self._config = None  # (executor, workers) the pool was started with
+
+    def submit_all(self, fn, calls: dict, executor: str, workers: int) -> dict:
+        """Submit fn(*args) for every key -> args in calls; returns key -> future."""
+        generations = index_generations() if executor == "process" else None
+        # Submitting under the lock: a concurrent restart cannot shut the pool down mid-batch
+        with self._lock:
+            stale = self._shared is not None and self._shared.generations != generations
+            if self._pool is None or self._config != (executor, workers) or stale:
+                self._close()
+                if executor == "process":
+                    from concurrent.futures import ProcessPoolExecutor
+                    self._shared = publish_shared_index()
+                    self._pool = ProcessPoolExecutor(max_workers=workers, initializer=attach_shared_index,
+                                                     initargs=(self._shared.path,))
+                else:
+                    from concurrent.futures import ThreadPoolExecutor
+                    self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="architecture-lookup")
+                self._config = (executor, workers)
+            return {key: self._pool.submit(fn, *args) for key, args in calls.items()}
+
+    def _close(self):
+        # Wait for the old workers (and any still attaching) before removing their file
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+# ============ REASONING RULE INDEX ============
+class _SubstringIndex:
+    """Suffix automaton over several strings: the first string containing a text.
+
+    Each state records the lowest index of the strings passing through it, so a
+    lookup is one walk over the text, independent of how many strings there are.
+    """
+
+    __slots__ = ("next", "first", "size")
+
+    def __init__(self, strings):
+        self.size = len(strings)  # also the "no string" marker in first
+        self.next = [{}]
+        length, link, first = [0], [-1], [len(strings)]
+
+        def new_state(size, transitions, suffix):
+            self.next.append(transitions)
+            length.append(size)
+            link.append(suffix)
+            first.append(len(strings))
+            return len(self.next) - 1
+
+        def split(p, q, char):
+            # Give the prefix of q's strings reachable from p its own state
+            clone = new_state(length[p] + 1, dict(self.next[q]), link[q])
+            while p != -1 and self.next[p].get(char) == q:
+                self.next[p][char] = clone
+                p = link[p]
+            link[q] = clone
+            return clone
+
+        for index, string in enumerate(strings):
+            first[0] = min(first[0], index)
+            last = 0
+            for char in string:
+                q = self.next[last].get(char)
+                if q is not None:
+                    # Already a substring of an earlier string: reuse (or split) its state
+                    last = q if length[q] == length[last] + 1 else split(last, q, char)
+                else:
+                    cur = new_state(length[last] + 1, {}, 0)
+                    p = last
+                    while p != -1 and char not in self.next[p]:
+                        self.next[p][char] = cur
+                        p = link[p]
+                    if p != -1:
+                        q = self.next[p][char]
+                        link[cur] = q if length[p] + 1 == length[q] else split(p, q, char)
+                    last = cur
+                first[last] = min(first[last], index)
+
+        # A substring occurs in every string whose prefixes reach it via suffix links
+        for state in sorted(range(1, len(self.next)), key=length.__getitem__, reverse=True):
+            first[link[state]] = min(first[link[state]], first[state])
+        self.first = first
+
+    def find_first(self, text):
+        """Lowest index of a string containing text, or None"""
+        state = 0
+        for char in text:
+            state = self.next[state].get(char)
+            if state is None:
+                return None
+        first = self.first[state]
+        return first if first < self.size else None
+
+
+class _ReasoningIndex:
+    """Precompiled Product_Category lookups with the same precedence as a linear scan.
+
+    exact: lowercased category -> first rule. partial: the first rule whose
+    category occurs in the query, or contains it. keyword: the first rule with
+    a category word occurring in the query. Each costs one pass over the query.
+    """
+
+    __slots__ = ("rules", "exact", "empty", "categories", "category_rules",
+                 "containing", "keywords", "keyword_rules")
+
+    def __init__(self, rules):
+        self.rules = rules
+        categories = [rule.get("Product_Category", "").lower() for rule in rules]
+        self.exact = {}
+        for index, category in enumerate(categories):
+            self.exact.setdefault(category, index)
+        # An empty category occurs in every query
+        self.empty = self.exact.get("")
+
+        # Patterns are numbered in order of first appearance, so the lowest
+        # matching pattern id is also the lowest matching rule
+        first_with = {}
+        first_with_word = {}
+        for index, category in enumerate(categories):
+            if category:
+                first_with.setdefault(category, index)
+            for word in category.replace("/", " ").replace("-", " ").split():
+                first_with_word.setdefault(word, index)
+        self.categories = KeywordAutomaton(list(first_with))
+        self.category_rules = list(first_with.values())
+        self.containing = _SubstringIndex(categories)
+        self.keywords = KeywordAutomaton(list(first_with_word))
+        self.keyword_rules = list(first_with_word.values())
+
+    def find(self, category: str) -> dict:
+        """First rule matching category exactly, else partially, else by keyword."""
+        category_lower = category.lower()
+        index = self.exact.get(category_lower)
+        if index is None:
+            candidates = [self.category_rules[i] for i in self.categories.find(category_lower)]
+            candidates.append(self.containing.find_first(category_lower))
+            candidates.append(self.empty)
+            candidates = [i for i in candidates if i is not None]
+            if candidates:
+                index = min(candidates)
+        if index is None:
+            found = self.keywords.find(category_lower)
+            if found:
+                index = self.keyword_rules[min(found)]
+        return {} if index is None else self.rules[index]
+
 
 # ============ ARCHITECTURE SYSTEM GENERATOR ============
 class ArchitectureSystemGenerator:
     """Generates backend architecture recommendations from aggregated searches."""
 
-    def __init__(self):
+    def __init__(self, max_workers: int = None, executor: str = None):
         self.reasoning_data = self._load_reasoning()
+        self.reasoning_index = _ReasoningIndex(self.reasoning_data)
+        self.max_workers = max_workers or MAX_WORKERS
+        self.executor = executor or EXECUTOR
+        self._worker_pool = _WorkerPool()
+        # Shut the pool down and remove its index file when the generator goes away (or at exit)
+        weakref.finalize(self, self._worker_pool.close)
 
     def _load_reasoning(self) -> list:
         """Load reasoning rules from CSV."""
-        filepath = DATA_DIR / REASONING_FILE
-        if not filepath.exists():
-            return []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return list(csv.DictReader(f))
-
-    def _multi_domain_search(self, query: str, arch_priority: list = None) -> dict:
-        """Execute searches across multiple domains."""
-        results = {}
+        return load_rows(REASONING_FILE)
+
+    def _run_searches(self, lookups: dict) -> dict:
+        """Run independent (query, domain, max_results) lookups concurrently.
+
+        Results come back keyed and ordered like `lookups`, whatever order the
+        workers finish in.
+        """
+        workers = self.max_workers
+        if workers is None:
+            workers = len(lookups) if self.executor == "thread" else (os.cpu_count() or 1)
+        workers = min(workers, len(lookups))
+        if self.executor == "serial" or workers <= 1:
+            return {key: search(*args) for key, args in lookups.items()}
+
+        futures = self._worker_pool.submit_all(search, lookups, self.executor, workers)
+        return {key: future.result() for key, future in futures.items()}
+
+    def close(self):
+        """Stop pooled workers and remove the process executor's shared index file."""
+        self._worker_pool.close()
+
+    def _domain_lookups(self, query: str, arch_priority: list = None) -> dict:
+        """Lookups for every SEARCH_CONFIG domain: domain -> (query, domain, max_results)."""
+        lookups = {}
         for domain, config in SEARCH_CONFIG.items():
             if domain == "architecture" and arch_priority:
                 priority_query = " ".join(arch_priority[:2]) if arch_priority else query
                 combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
+                lookups[domain] = (combined_query, domain, config["max_results"])
             else:
-                results[domain] = search(query, domain, config["max_results"])
-        return results
+                lookups[domain] = (query, domain, config["max_results"])
+        return lookups
+
+    def _build_plan(self, query: str) -> dict:
+        """Every lookup generate() needs: consumer -> (query, domain, max_results)."""
+        plan = {
+            "category_product": (query, "product", 1),
+            "language": (query, "language", 2),
+        }
+        plan.update(self._domain_lookups(query))
+        return plan
+
+    def _execute_plan(self, plan: dict) -> dict:
+        """Run each distinct (query, domain) lookup once, at the largest max_results requested.
+
+        Rankings are deterministic, so a consumer that asked for fewer results gets
+        the prefix of the shared lookup.
+        """
+        distinct = {}
+        for lookup_query, domain, max_results in plan.values():
+            key = (lookup_query, domain)
+            distinct[key] = max(max_results, distinct.get(key, 0))
+        fetched = self._run_searches({key: (key[0], key[1], k) for key, k in distinct.items()})
+        return {
+            consumer: _take(fetched[(lookup_query, domain)], max_results)
+            for consumer, (lookup_query, domain, max_results) in plan.items()
+        }
 
     def _find_reasoning_rule(self, category: str) -> dict:
         """Find matching reasoning rule for a product category."""
-        category_lower = category.lower()
-
-        # Try exact match first
-        for rule in self.reasoning_data:
-            if rule.get("Product_Category", "").lower() == category_lower:
-                return rule
-
-        # Try partial match
-        for rule in self.reasoning_data:
-            prod_cat = rule.get("Product_Category", "").lower()
-            if prod_cat in category_lower or category_lower in prod_cat:
-                return rule
-
-        # Try keyword match
-        for rule in self.reasoning_data:
-            prod_cat = rule.get("Product_Category", "").lower()
-            keywords = prod_cat.replace("/", " ").replace("-", " ").split()
-            if any(kw in category_lower for kw in keywords):
-                return rule
-
-        return {}
+        return self.reasoning_index.find(category)
 
     def _apply_reasoning(self, category: str) -> dict:
         """Apply reasoning rules to get architecture recommendations."""
@@ -125,8 +338,11 @@ class ArchitectureSystemGenerator:
 
     def generate(self, query: str, project_name: str = None) -> dict:
         """Generate complete backend architecture recommendation."""
+        # All domain lookups are independent: plan them up front, run each distinct one once
+        search_results = self._execute_plan(self._build_plan(query))
+
         # Step 1: Search product to get category
-        product_result = search(query, "product", 1)
+        product_result = search_results.pop("category_product")
         product_results = product_result.get("results", [])
         category = "General"
         product_info = {}
@@ -137,8 +353,8 @@ class ArchitectureSystemGenerator:
         # Step 2: Get reasoning rules for this category
         reasoning = self._apply_reasoning(category)
 
-        # Step 3: Multi-domain search
-        search_results = self._multi_domain_search(query)
+        # Step 3: Multi-domain search (already fetched above)
+        language_result = search_results.pop("language")
         search_results["product"] = product_result
 
         # Step 4: Extract results from each domain
@@ -174,7 +390,7 @@ class ArchitectureSystemGenerator:
             },
             "stack": {
                 "priority": reasoning.get("stack_priority", []),
-                "languages": [r.get("name", "") for r in self._extract_results(search(query, "language", 2))]
+                "languages": [r.get("name", "") for r in self._extract_results(language_result)]
             },
             "database": {
                 "priority": reasoning.get("database_priority", []),
@@ -471,7 +687,8 @@ def format_markdown(arch_system: dict) -> str:
 
 # ============ MAIN ENTRY POINT ============
 def generate_architecture_system(query: str, project_name: str = None, output_format: str = "ascii",
-                                  persist: bool = False, service: str = None, output_dir: str = None) -> str:
+                                  persist: bool = False, service: str = None, output_dir: str = None,
+                                  generator: ArchitectureSystemGenerator = None) -> str:
     """
     Main entry point for architecture system generation.
 
@@ -482,11 +699,12 @@ def generate_architecture_system(query: str, project_name: str = None, output_fo
         persist: If True, save to architecture-system/ folder
         service: Optional service name for service-specific override file
         output_dir: Optional output directory
+        generator: Optional pre-loaded generator to reuse (e.g. in the search daemon)
 
     Returns:
         Formatted architecture system string
     """
-    generator = ArchitectureSystemGenerator()
+    generator = generator or ArchitectureSystemGenerator()
     arch_system = generator.generate(query, project_name)
 
     # Persist to files if requested
@@ -552,6 +770,7 @@ def persist_architecture_system(arch_system: dict, service: str = None, output_d
 
 def format_master_md(arch_system: dict) -> str:
     """Format architecture system as MASTER.md with hierarchical override logic."""
+    from datetime import datetime
     project = arch_system.get("project_name", "PROJECT")
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
@@ -578,6 +797,7 @@ def format_master_md(arch_system: dict) -> str:
 
 def format_service_override_md(arch_system: dict, service_name: str, service_query: str = None) -> str:
     """Format a service-specific override file."""
+    from datetime import datetime
     project = arch_system.get("project_name", "PROJECT")
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     service_title = service_name.replace("-", " ").replace("_", " ").title()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend Architect Bundle Builder - packs the scripts and a precompiled knowledge
+snapshot into one executable zipapp.
+
+Usage:
+    python bundle.py [-o backend-architect.pyz]
+    python backend-architect.pyz "<query>" --domain api      # same CLI as search.py
+
+The archive holds:
+    *.py / *.pyc     scripts, plus byte-compiled copies (used when the Python version matches)
+    snapshot.bin     rows and fitted BM25 indexes of every domain and stack (core.export_snapshot)
+    __main__.py      loads the snapshot with a single read, then runs search.main()
+
+Members are stored uncompressed, so loading the snapshot is one read with no inflate step.
+The snapshot is frozen at build time: rebuild the bundle after editing data/*.csv.
+"""
+
+import argparse
+import py_compile
+import shutil
+import sys
+import tempfile
+import zipapp
+from pathlib import Path
+
+from core import export_snapshot
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+MODULES = ["core", "search", "handlers", "architecture_system", "daemon", "disk_cache"]
+SNAPSHOT_NAME = "snapshot.bin"
+
+MAIN_TEMPLATE = '''# -*- coding: utf-8 -*-
+"""Backend Architect bundled entry point (generated by bundle.py)"""
+import os
+import sys
+
+import core
+
+_ARCHIVE = os.path.abspath(sys.argv[0])
+core.load_snapshot(__loader__.get_data(os.path.join(_ARCHIVE, "{snapshot}")))
+
+import daemon
+daemon.SPAWN_TARGET = daemon.Path(_ARCHIVE)
+
+import search
+search.main()
+'''
+
+
+def build_bundle(output: Path) -> Path:
+    """Write the zipapp to output and return its path."""
+    output = Path(output).resolve()
+    with tempfile.TemporaryDirectory() as staging:
+        staging = Path(staging)
+        for module in MODULES:
+            source = SCRIPTS_DIR / f"{module}.py"
+            shutil.copyfile(source, staging / source.name)
+            # Legacy-location .pyc next to the source is what zipimport looks for.
+            # Unchecked hash-based pycs skip the source comparison; zipimport falls
+            # back to the .py when the magic number belongs to another Python.
+            py_compile.compile(str(source), cfile=str(staging / f"{module}.pyc"), dfile=f"{module}.py",
+                               doraise=True, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+        (staging / SNAPSHOT_NAME).write_bytes(export_snapshot())
+        (staging / "__main__.py").write_text(MAIN_TEMPLATE.format(snapshot=SNAPSHOT_NAME), encoding="utf-8")
+        zipapp.create_archive(staging, output, interpreter="/usr/bin/env python3", compressed=False)
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the single-file Backend Architect zipapp")
+    parser.add_argument("--output", "-o", type=str, default="backend-architect.pyz", help="Output .pyz path")
+    args = parser.parse_args()
+
+    path = build_bundle(args.output)
+    print(f"✅ {path} ({path.stat().st_size // 1024} KB)")
+    sys.exit(0)
@@ -1,18 +1,46 @@
 # -*- coding: utf-8 -*-
 """
 Backend Architect Skill Core - BM25 search engine for backend architecture guides
+
+Startup matters (agents run one process per query), so modules needed only to
+(re)build an index - csv, numpy - are imported where they are used.
 """
 
-import csv
+import marshal
+import os
 import re
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import heappush, heapreplace
+from itertools import count
 from pathlib import Path
 from math import log
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
+INDEX_DIR = DATA_DIR.parent / "index"
+INDEX_FORMAT_VERSION = 4
 MAX_RESULTS = 3
 
+# Slack for float rounding when comparing MaxScore upper bounds to the threshold
+_BOUND_EPSILON = 1e-9
+
+# Scoring engine: "python", "numpy" or "auto" (numpy when installed and the corpus is large)
+ENGINE = os.environ.get("BACKEND_ARCHITECT_ENGINE", "auto")
+_NUMPY_MIN_DOCS = 2000
+
+# In-process result cache: max entries (0 disables) and time-to-live in seconds (0 = no expiry)
+RESULT_CACHE_SIZE = int(os.environ.get("BACKEND_ARCHITECT_CACHE_SIZE", 256))
+RESULT_CACHE_TTL = float(os.environ.get("BACKEND_ARCHITECT_CACHE_TTL", 300))
+
+# How often (seconds) an IndexReloader polls loaded data files for changes
+RELOAD_INTERVAL = float(os.environ.get("BACKEND_ARCHITECT_RELOAD_INTERVAL", 2))
+
 CSV_CONFIG = {
     "architecture": {
         "file": "architectures.csv",
@@ -89,163 +117,2173 @@ _STACK_COLS = {
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 AVAILABLE_DOMAINS = list(CSV_CONFIG.keys())
 
+# Domains an auto-domain query may be routed to; backend-reasoning holds rules for
+# the architecture generator rather than answers
+AUTO_DOMAINS = [domain for domain in AVAILABLE_DOMAINS if domain != "backend-reasoning"]
+
+# Below this routing confidence a domain-less query searches the top two domains
+ROUTER_MIN_CONFIDENCE = float(os.environ.get("BACKEND_ARCHITECT_ROUTER_CONFIDENCE", 0.25))
+
 
 # ============ BM25 IMPLEMENTATION ============
+# Punctuation = anything but \w and \s. ASCII text (the common case) goes through a
+# str.translate table; the Unicode regex is compiled on first non-ASCII input
+# because compiling it costs more than the rest of this module's import.
+_ASCII_PUNCT_TABLE = str.maketrans({
+    chr(c): ' ' for c in range(128)
+    if not (chr(c).isalnum() or chr(c) == '_' or chr(c).isspace())
+})
+_punct_re = None
+
+
+def _strip_punctuation(text):
+    global _punct_re
+    if text.isascii():
+        return text.translate(_ASCII_PUNCT_TABLE)
+    if _punct_re is None:
+        _punct_re = re.compile(r'[^\w\s]')
+    return _punct_re.sub(' ', text)
+
+
+_numpy = None
+
+
+def _load_numpy():
+    """Import NumPy on first use; returns None when it is not installed"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+class _NumpyScorer:
+    """Vectorized BM25 scoring over the index's term-major CSR arrays.
+
+    Row t holds the documents containing term t and the precomputed BM25 weight
+    of t in each, so scoring a query is one gather-and-add per query token.
+    """
+
+    __slots__ = ("np", "N", "term_ptr", "doc_ids", "weights")
+
+    def __init__(self, bm25, np):
+        self.np = np
+        self.N = len(bm25.doc_lengths)  # doc id space: includes deleted row ids
+        self.term_ptr = bm25.term_ptr
+        self.doc_ids = np.frombuffer(bm25.post_docs, dtype=np.uint32).astype(np.int64)
+        tfs = np.frombuffer(bm25.post_tfs, dtype=np.uint32).astype(np.float64)
+        norms = np.frombuffer(bm25.norms, dtype=np.float32).astype(np.float64)
+        idf = np.repeat(np.frombuffer(bm25.idf, dtype=np.float64), np.diff(np.frombuffer(bm25.term_ptr, dtype=np.uint32)))
+        # Same operations in the same order as the pure-Python path: bit-identical weights
+        self.weights = idf * (tfs * (bm25.k1 + 1)) / (tfs + norms[self.doc_ids])
+
+    def scores(self, term_ids):
+        """Dense score vector for a query given as term ids"""
+        scores = self.np.zeros(self.N, dtype=self.np.float64)
+        for term_id in term_ids:
+            start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            # Doc ids within a row are unique, so fancy-index += is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def _select(self, scores, k):
+        """Top k (doc_id, score) pairs of a dense vector, ties broken by doc id"""
+        np = self.np
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            # Keep everything tied with the k-th score, then order exactly
+            kth = np.partition(scores[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[scores[candidates] >= kth]
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+    def top_k(self, term_ids, k):
+        return self._select(self.scores(term_ids), k)
+
+    def top_k_batch(self, term_id_lists, k):
+        """Score a block of queries with one bincount over all gathered postings.
+
+        bincount accumulates in input order, so each (query, doc) sum is formed in
+        query-token order exactly as in scores(). Blocks are sized to bound memory.
+        """
+        np = self.np
+        per_block = max(1, _NUMPY_BATCH_CELLS // max(self.N, 1))
+        results = []
+        for first in range(0, len(term_id_lists), per_block):
+            block = term_id_lists[first:first + per_block]
+            cells = []
+            weights = []
+            for i, term_ids in enumerate(block):
+                for term_id in term_ids:
+                    start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+                    cells.append(self.doc_ids[start:end] + i * self.N)
+                    weights.append(self.weights[start:end])
+            if not cells:
+                results.extend([] for _ in block)
+                continue
+            matrix = np.bincount(np.concatenate(cells), weights=np.concatenate(weights),
+                                 minlength=len(block) * self.N).reshape(len(block), self.N)
+            results.extend(self._select(matrix[i], k) for i in range(len(block)))
+        return results
+
+
+# Upper bound on query x document cells materialized per NumPy batch block
+_NUMPY_BATCH_CELLS = 1 << 22
+
+# Typed arrays making up a fitted index: attribute -> array typecode
+_BM25_ARRAYS = {
+    "idf": "d",          # per term id
+    "max_impact": "d",   # per term id: best contribution to any document (MaxScore bound)
+    "term_ptr": "I",     # per term id + 1: postings of term t are [term_ptr[t], term_ptr[t + 1])
+    "post_docs": "I",    # per posting: document id, ascending within a term
+    "post_tfs": "I",     # per posting: term frequency
+    "doc_lengths": "I",  # per document: token count
+    "norms": "f",        # per document: k1 * (1 - b + b * dl / avgdl)
+}
+
+
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """BM25 ranking algorithm for text search.
+
+    The fitted index is compact enough for large corpora: terms are interned to
+    ids, postings are flat CSR arrays, and per-term / per-document values live in
+    typed arrays (see _BM25_ARRAYS) instead of dicts and lists of Python objects.
+
+    Documents can also be added, updated and deleted by row id without a refit:
+    changes go to a small delta segment plus tombstones over the CSR arrays, IDF
+    and norms are recomputed in bulk on the next query, and compact() folds the
+    delta back in. Updates are not synchronized with concurrent searches, so
+    a published index is updated through copy() (SearchEngine does this for
+    rows appended to a data file, see _append_rows).
+    """
 
-    def __init__(self, k1=1.5, b=0.75):
+    __slots__ = ("k1", "b", "engine", "N", "avgdl", "vocab", "deleted", "_numpy_scorer",
+                 "_delta", "_delta_docs", "_dead", "_df_delta", "_total_length", "_stale", "_changed") + tuple(_BM25_ARRAYS)
+
+    def __init__(self, k1=1.5, b=0.75, engine=None):
         self.k1 = k1
         self.b = b
-        self.corpus = []
-        self.doc_lengths = []
-        self.avgdl = 0
-        self.idf = {}
-        self.doc_freqs = defaultdict(int)
+        self.engine = engine or ENGINE
+        self._numpy_scorer = None
         self.N = 0
+        self.avgdl = 0
+        self.vocab = {}  # term -> term id
+        for name, typecode in _BM25_ARRAYS.items():
+            setattr(self, name, array(typecode))
+        self.term_ptr.append(0)
+        self.deleted = set()  # row ids removed by delete(); never reused
+        # Pending incremental changes (see add/update/delete and compact)
+        self._delta = {}        # term id -> {doc id: tf} for documents (re)indexed since compact()
+        self._delta_docs = {}   # doc id -> {term id: tf} for the same documents
+        self._dead = set()      # doc ids whose postings in the CSR arrays are stale
+        self._df_delta = Counter()  # term id -> change in document frequency
+        self._total_length = None   # sum of live document lengths, tracked once updates start
+        self._stale = False     # idf / norms / avgdl need recomputing
+        self._changed = False   # documents changed since compact(): max_impact bounds are loose
 
-    def tokenize(self, text):
+    def _scorer(self):
+        """The NumPy scorer when the configured engine calls for it, else None"""
+        if self.engine == "python" or (self.engine == "auto" and self.N < _NUMPY_MIN_DOCS):
+            return None
+        if self._numpy_scorer is None:
+            np = _load_numpy()
+            if np is None:
+                return None
+            # Idempotent, so threads racing here need no lock: any scorer built is equivalent
+            self._numpy_scorer = _NumpyScorer(self, np)
+        return self._numpy_scorer
+
+    @staticmethod
+    def tokenize(text):
         """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
+        text = _strip_punctuation(str(text).lower())
         return [w for w in text.split() if len(w) > 2]
 
     def fit(self, documents):
-        """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
+        """Build the inverted index (CSR postings per term id) and length norms"""
+        vocab = {}
+        term_docs = []
+        term_tfs = []
+        doc_lengths = array('I')
+        for doc_id, doc in enumerate(documents):
+            tokens = self.tokenize(doc)
+            doc_lengths.append(len(tokens))
+            for word, tf in Counter(tokens).items():
+                term_id = vocab.get(word)
+                if term_id is None:
+                    term_id = vocab[sys.intern(word)] = len(term_docs)
+                    term_docs.append(array('I'))
+                    term_tfs.append(array('I'))
+                term_docs[term_id].append(doc_id)
+                term_tfs[term_id].append(tf)
+
+        self.__init__(self.k1, self.b, self.engine)
+        self.vocab = vocab
+        self.doc_lengths = doc_lengths
+        self.N = len(doc_lengths)
         if self.N == 0:
             return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
-        self.avgdl = sum(self.doc_lengths) / self.N
+        self.avgdl = sum(doc_lengths) / self.N
+
+        # Per-document part of the BM25 denominator, independent of the query
+        # (all-empty corpora have no postings, so their norms are never read)
+        self.norms = array('f', (self.k1 * (1 - self.b + self.b * dl / self.avgdl) if self.avgdl else 0.0
+                                 for dl in doc_lengths))
+
+        for term_id in range(len(term_docs)):
+            docs, tfs = term_docs[term_id], term_tfs[term_id]
+            # Release each term's arrays once copied so peak memory stays near one copy
+            term_docs[term_id] = term_tfs[term_id] = None
+            self.post_docs.extend(docs)
+            self.post_tfs.extend(tfs)
+            self.term_ptr.append(len(self.post_docs))
+            freq = len(docs)
+            self.idf.append(log((self.N - freq + 0.5) / (freq + 0.5) + 1))
+        self._compute_max_impact()
+
+    def _compute_max_impact(self):
+        """Upper bound of each term's contribution to any document (for MaxScore)"""
+        k1_plus = self.k1 + 1
+        norms, post_docs, post_tfs, term_ptr = self.norms, self.post_docs, self.post_tfs, self.term_ptr
+        self.max_impact = array('d', (
+            max((self.idf[t] * (post_tfs[i] * k1_plus) / (post_tfs[i] + norms[post_docs[i]])
+                 for i in range(term_ptr[t], term_ptr[t + 1])), default=0.0)
+            for t in range(len(self.idf))
+        ))
+
+    # ---- incremental updates ----
+    def copy(self):
+        """Independent copy to update while searches keep using this index"""
+        clone = BM25(self.k1, self.b, self.engine)
+        clone.N, clone.avgdl = self.N, self.avgdl
+        clone.vocab = dict(self.vocab)
+        clone.deleted = set(self.deleted)
+        for name, typecode in _BM25_ARRAYS.items():
+            setattr(clone, name, array(typecode, getattr(self, name)))
+        clone._delta = {term_id: dict(docs) for term_id, docs in self._delta.items()}
+        clone._delta_docs = {doc_id: dict(tfs) for doc_id, tfs in self._delta_docs.items()}
+        clone._dead = set(self._dead)
+        clone._df_delta = Counter(self._df_delta)
+        clone._total_length = self._total_length
+        clone._stale, clone._changed = self._stale, self._changed
+        return clone
+
+    def _pending(self):
+        """Whether documents changed since the last fit()/compact()"""
+        # Not just a non-empty delta: deleting a delta-only document empties it,
+        # yet statistics, norms and max_impact still differ from the CSR arrays'
+        return self._changed
 
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+    def _make_mutable(self):
+        """Copy read-only buffers (e.g. a shared mapping) into arrays before the first update"""
+        for name, typecode in _BM25_ARRAYS.items():
+            values = getattr(self, name)
+            if not isinstance(values, array):
+                setattr(self, name, array(typecode, values))
+        if self._total_length is None:
+            self._total_length = sum(self.doc_lengths)
 
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+    def _check_doc(self, doc_id):
+        if not 0 <= doc_id < len(self.doc_lengths) or doc_id in self.deleted:
+            raise KeyError(f"No document with row id {doc_id}")
+
+    def _index_doc(self, doc_id, text):
+        tokens = self.tokenize(text)
+        tfs = {}
+        for word, tf in Counter(tokens).items():
+            term_id = self.vocab.get(word)
+            if term_id is None:
+                term_id = self.vocab[sys.intern(word)] = len(self.idf)
+                self.term_ptr.append(self.term_ptr[-1])
+                self.idf.append(0.0)
+                self.max_impact.append(0.0)
+            tfs[term_id] = tf
+            self._delta.setdefault(term_id, {})[doc_id] = tf
+            self._df_delta[term_id] += 1
+        self._delta_docs[doc_id] = tfs
+        self.doc_lengths[doc_id] = len(tokens)
+        self._total_length += len(tokens)
+        self.N += 1
+        self._stale = self._changed = True
+
+    def _unindex_doc(self, doc_id):
+        tfs = self._delta_docs.pop(doc_id, None)
+        if tfs is not None:
+            for term_id in tfs:
+                del self._delta[term_id][doc_id]
+                self._df_delta[term_id] -= 1
+        elif doc_id not in self._dead:
+            # No forward index: find the document's terms by probing each postings row
+            self._dead.add(doc_id)
+            post_docs, term_ptr = self.post_docs, self.term_ptr
+            for term_id in range(len(term_ptr) - 1):
+                end = term_ptr[term_id + 1]
+                pos = bisect_left(post_docs, doc_id, term_ptr[term_id], end)
+                if pos < end and post_docs[pos] == doc_id:
+                    self._df_delta[term_id] -= 1
+        self._total_length -= self.doc_lengths[doc_id]
+        self.doc_lengths[doc_id] = 0
+        self.N -= 1
+        self._stale = self._changed = True
+
+    def add(self, text):
+        """Index a new document; returns its row id (the next id after all existing rows)"""
+        self._make_mutable()
+        doc_id = len(self.doc_lengths)
+        self.doc_lengths.append(0)
+        self.norms.append(0.0)
+        self._index_doc(doc_id, text)
+        return doc_id
+
+    def update(self, doc_id, text):
+        """Replace the text of an existing document, keeping its row id"""
+        self._check_doc(doc_id)
+        self._make_mutable()
+        self._unindex_doc(doc_id)
+        self._index_doc(doc_id, text)
+
+    def delete(self, doc_id):
+        """Remove a document from results and statistics; its row id is not reused"""
+        self._check_doc(doc_id)
+        self._make_mutable()
+        self._unindex_doc(doc_id)
+        self.deleted.add(doc_id)
+
+    def _refresh(self):
+        """Recompute avgdl, norms and IDF in bulk after incremental updates"""
+        self.avgdl = self._total_length / self.N if self.N else 0
+        if self.avgdl:
+            self.norms = array('f', (self.k1 * (1 - self.b + self.b * dl / self.avgdl) for dl in self.doc_lengths))
+        term_ptr, df_delta = self.term_ptr, self._df_delta
+        for term_id in range(len(self.idf)):
+            freq = term_ptr[term_id + 1] - term_ptr[term_id] + df_delta[term_id]
+            self.idf[term_id] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+        self._numpy_scorer = None
+        self._stale = False
+
+    def compact(self):
+        """Fold pending updates into the CSR arrays and restore exact MaxScore bounds"""
+        if self._stale:
+            self._refresh()
+        if not self._pending():
+            return
+        post_docs, post_tfs, term_ptr, dead = self.post_docs, self.post_tfs, self.term_ptr, self._dead
+        new_ptr, new_docs, new_tfs = array('I', [0]), array('I'), array('I')
+        for term_id in range(len(term_ptr) - 1):
+            start, end = term_ptr[term_id], term_ptr[term_id + 1]
+            delta = self._delta.get(term_id)
+            if not delta and not dead:
+                # Untouched term: copy its postings row as a slice
+                new_docs.extend(post_docs[start:end])
+                new_tfs.extend(post_tfs[start:end])
+                new_ptr.append(len(new_docs))
+                continue
+            postings = [(post_docs[i], post_tfs[i]) for i in range(start, end) if post_docs[i] not in dead]
+            if delta:
+                postings.extend(delta.items())
+                postings.sort()
+            for doc_id, tf in postings:
+                new_docs.append(doc_id)
+                new_tfs.append(tf)
+            new_ptr.append(len(new_docs))
+        self.term_ptr, self.post_docs, self.post_tfs = new_ptr, new_docs, new_tfs
+        self._delta, self._delta_docs, self._dead = {}, {}, set()
+        self._df_delta = Counter()
+        self._changed = False
+        self._compute_max_impact()
+        self._numpy_scorer = None
+
+    def doc_freq(self, term):
+        """Number of documents containing term"""
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            return 0
+        return self.term_ptr[term_id + 1] - self.term_ptr[term_id] + self._df_delta[term_id]
+
+    def memory_usage(self):
+        """Approximate index size in bytes, total and per document"""
+        total = sys.getsizeof(self.vocab) + sum(sys.getsizeof(term) for term in self.vocab)
+        total += sum(memoryview(getattr(self, name)).nbytes for name in _BM25_ARRAYS)
+        return {"documents": self.N, "terms": len(self.vocab), "postings": len(self.post_docs),
+                "bytes": total, "bytes_per_doc": total / self.N if self.N else 0.0}
+
+    def state(self):
+        """Return the fitted index as plain data (for persisting)"""
+        self.compact()
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "N": self.N,
+            "avgdl": self.avgdl,
+            "byteorder": sys.byteorder,
+            "terms": tuple(self.vocab),
+            "deleted": tuple(sorted(self.deleted)),
+            "arrays": {name: (getattr(self, name).itemsize, getattr(self, name).tobytes()) for name in _BM25_ARRAYS},
+        }
+
+    @classmethod
+    def from_state(cls, state, engine=None):
+        """Rebuild a fitted index from state() output without refitting"""
+        bm25 = cls(state["k1"], state["b"], engine)
+        bm25.N = state["N"]
+        bm25.avgdl = state["avgdl"]
+        bm25.vocab = {sys.intern(term): term_id for term_id, term in enumerate(state["terms"])}
+        bm25.deleted = set(state.get("deleted", ()))
+        for name, typecode in _BM25_ARRAYS.items():
+            itemsize, data = state["arrays"][name]
+            values = array(typecode)
+            if values.itemsize != itemsize:
+                raise ValueError(f"Index array {name} was built with a different item size")
+            values.frombytes(data)
+            if state["byteorder"] != sys.byteorder:
+                values.byteswap()
+            setattr(bm25, name, values)
+        return bm25
+
+    @classmethod
+    def from_buffers(cls, params, buffers, engine=None):
+        """Index over existing byte buffers (e.g. a shared mapping) without copying them"""
+        bm25 = cls(params["k1"], params["b"], engine)
+        bm25.N = params["N"]
+        bm25.avgdl = params["avgdl"]
+        bm25.vocab = {sys.intern(term): term_id for term_id, term in enumerate(params["terms"])}
+        bm25.deleted = set(params.get("deleted", ()))
+        for name, typecode in _BM25_ARRAYS.items():
+            setattr(bm25, name, buffers[name].cast(typecode))
+        return bm25
+
+    @classmethod
+    def merge(cls, indexes, engine=None):
+        """One index over several fitted ones without retokenizing.
+
+        Documents are numbered in order (each index's ids shifted past the
+        previous ones); IDF and length norms are recomputed over the combined
+        corpus, so the result equals fitting all documents together.
+        """
+        merged = cls(engine=engine)
+        vocab = merged.vocab
+        parts = []  # merged term id -> [(index, term id, doc id offset)]
+        offset = 0
+        for bm25 in indexes:
+            bm25.compact()
+            for term, term_id in bm25.vocab.items():
+                merged_id = vocab.setdefault(term, len(parts))
+                if merged_id == len(parts):
+                    parts.append([])
+                parts[merged_id].append((bm25, term_id, offset))
+            merged.doc_lengths.extend(bm25.doc_lengths)
+            merged.deleted.update(doc_id + offset for doc_id in bm25.deleted)
+            merged.N += bm25.N
+            offset += len(bm25.doc_lengths)
+        if merged.N == 0:
+            return merged
+        merged.avgdl = sum(merged.doc_lengths) / merged.N
+        merged.norms = array('f', (merged.k1 * (1 - merged.b + merged.b * dl / merged.avgdl) if merged.avgdl else 0.0
+                                   for dl in merged.doc_lengths))
+
+        post_docs, post_tfs = merged.post_docs, merged.post_tfs
+        for term_parts in parts:
+            for bm25, term_id, offset in term_parts:
+                start, end = bm25.term_ptr[term_id], bm25.term_ptr[term_id + 1]
+                post_docs.extend(doc_id + offset for doc_id in bm25.post_docs[start:end])
+                post_tfs.extend(bm25.post_tfs[start:end])
+            freq = len(post_docs) - merged.term_ptr[-1]
+            merged.term_ptr.append(len(post_docs))
+            merged.idf.append(log((merged.N - freq + 0.5) / (freq + 0.5) + 1))
+        merged._compute_max_impact()
+        return merged
+
+    def _term_ids(self, query):
+        """Query tokens that exist in the index, as term ids in query order"""
+        vocab = self.vocab
+        return [vocab[t] for t in self.tokenize(query) if t in vocab]
 
     def score(self, query):
-        """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
+        """Score documents containing at least one query term, best first"""
+        if self._stale:
+            self._refresh()
+        scores = defaultdict(float)
+        norms, post_docs, post_tfs, term_ptr = self.norms, self.post_docs, self.post_tfs, self.term_ptr
+        dead = self._dead
+        k1_plus = self.k1 + 1
+
+        for term_id in self._term_ids(query):
+            idf = self.idf[term_id]
+            for i in range(term_ptr[term_id], term_ptr[term_id + 1]):
+                tf = post_tfs[i]
+                doc_id = post_docs[i]
+                if dead and doc_id in dead:
+                    continue
+                scores[doc_id] += idf * (tf * k1_plus) / (tf + norms[doc_id])
+            for doc_id, tf in self._delta.get(term_id, {}).items():
+                scores[doc_id] += idf * (tf * k1_plus) / (tf + norms[doc_id])
+
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+    def max_score(self, query):
+        """Upper bound on any document's score for query (sum of per-term bounds)"""
+        if self._stale:
+            self._refresh()
+        term_ids = self._term_ids(query)
+        if self._pending():
+            # Exact bounds are restored by compact(); tf / (tf + norm) < 1 meanwhile
+            return sum(self.idf[t] * (self.k1 + 1) for t in term_ids)
+        return sum(self.max_impact[t] for t in term_ids)
 
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
+    def top_k(self, query, k, min_score=0.0):
+        """Return the k best (doc_id, score) pairs, same order as score()[:k].
 
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+        Document-at-a-time MaxScore: terms are ordered by their upper bound, and
+        once the k-th best score exceeds the combined bound of the weakest terms,
+        documents matching only those terms are never visited. Surviving
+        candidates are scored in query order so scores match score() exactly.
+        Only documents scoring above min_score are returned; a positive floor
+        prunes like a full heap does from the start.
+        """
+        if self._stale:
+            self._refresh()
+        if self._pending():
+            # MaxScore bounds and the NumPy rows cover only the compacted postings
+            return [hit for hit in self.score(query) if hit[1] > min_score][:max(k, 0)]
+        term_ids = self._term_ids(query)
+        if k <= 0 or not term_ids:
+            return []
+        scorer = self._scorer()
+        if scorer is not None:
+            return [hit for hit in scorer.top_k(term_ids, k) if hit[1] > min_score]
 
-            scores.append((idx, score))
+        idf, max_impact, norms = self.idf, self.max_impact, self.norms
+        post_docs, post_tfs, term_ptr = self.post_docs, self.post_tfs, self.term_ptr
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+        # Repeated query tokens count once per occurrence, as in score()
+        weights = Counter(term_ids)
+        terms = sorted(weights, key=lambda t: weights[t] * max_impact[t])
+        ends = [term_ptr[t + 1] for t in terms]
+        bounds = []
+        total = 0.0
+        for t in terms:
+            total += weights[t] * max_impact[t]
+            bounds.append(total)
+
+        k1_plus = self.k1 + 1
+        cursors = [term_ptr[t] for t in terms]
+        heap = []  # min-heap of (score, -doc_id); worst kept result on top
+        threshold = 0.0
+        first_essential = 0  # terms[:first_essential] alone cannot beat threshold
+        while first_essential < len(terms) and bounds[first_essential] + _BOUND_EPSILON <= min_score:
+            first_essential += 1
+
+        while True:
+            # Next candidate: smallest unvisited doc id among essential terms
+            candidate = None
+            for i in range(first_essential, len(terms)):
+                pos = cursors[i]
+                if pos < ends[i]:
+                    doc_id = post_docs[pos]
+                    if candidate is None or doc_id < candidate:
+                        candidate = doc_id
+            if candidate is None:
+                break
+
+            tfs = {}
+            for i in range(first_essential, len(terms)):
+                pos = cursors[i]
+                if pos < ends[i] and post_docs[pos] == candidate:
+                    tfs[terms[i]] = post_tfs[pos]
+                    cursors[i] = pos + 1
+
+            # Bound check: essential contributions plus the best the rest could add
+            norm = norms[candidate]
+            upper = bounds[first_essential - 1] if first_essential else 0.0
+            for t, tf in tfs.items():
+                upper += weights[t] * idf[t] * (tf * k1_plus) / (tf + norm)
+            if upper + _BOUND_EPSILON <= min_score or (len(heap) == k and upper + _BOUND_EPSILON <= threshold):
+                continue
+
+            for i in range(first_essential):
+                pos = bisect_left(post_docs, candidate, cursors[i], ends[i])
+                cursors[i] = pos
+                if pos < ends[i] and post_docs[pos] == candidate:
+                    tfs[terms[i]] = post_tfs[pos]
+
+            score = 0.0
+            for t in term_ids:
+                tf = tfs.get(t)
+                if tf:
+                    score += idf[t] * (tf * k1_plus) / (tf + norm)
+
+            # Doc ids arrive in increasing order, so a tie never displaces an earlier row
+            if score <= min_score:
+                continue
+            if len(heap) < k:
+                heappush(heap, (score, -candidate))
+            elif score > threshold:
+                heapreplace(heap, (score, -candidate))
+            else:
+                continue
+
+            if len(heap) == k:
+                threshold = heap[0][0]
+                while first_essential < len(terms) and bounds[first_essential] + _BOUND_EPSILON <= threshold:
+                    first_essential += 1
+                if first_essential == len(terms):
+                    break
+
+        return sorted(((-neg_id, score) for score, neg_id in heap), key=lambda x: (-x[1], x[0]))
+
+    def top_k_batch(self, queries, k):
+        """top_k() for many queries; the NumPy engine scores them as one matrix"""
+        if self._stale:
+            self._refresh()
+        scorer = None if self._pending() else self._scorer()
+        if scorer is None or k <= 0:
+            return [self.top_k(query, k) for query in queries]
+        return scorer.top_k_batch([self._term_ids(query) for query in queries], k)
 
 
 # ============ SEARCH FUNCTIONS ============
 def _load_csv(filepath):
     """Load CSV and return list of dicts"""
+    import csv
     with open(filepath, 'r', encoding='utf-8') as f:
         return list(csv.DictReader(f))
 
 
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
-    """Core search function using BM25"""
-    if not filepath.exists():
-        return []
+# Bytes read per chunk when hashing or streaming a data file
+_READ_CHUNK = 1 << 20
+
+
+class _ContentHash:
+    """hashlib-style hasher for data files: CRC-32, Adler-32 and length.
+
+    It only tells a current compiled index from a stale one, and unlike hashlib
+    zlib does not load OpenSSL, which every cold start would pay for.
+    """
+    __slots__ = ("crc", "adler", "size")
+
+    def __init__(self):
+        self.crc, self.adler, self.size = 0, 1, 0
+
+    def update(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.adler = zlib.adler32(data, self.adler)
+        self.size += len(data)
+
+    def hexdigest(self):
+        return f"{self.crc:08x}{self.adler:08x}-{self.size}"
+
+
+def _hashed_text(f, hasher):
+    """Text stream over a binary file that feeds every byte it reads into hasher"""
+    import io
 
-    data = _load_csv(filepath)
+    class HashingReader(io.RawIOBase):
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            n = f.readinto(buffer)
+            if n:
+                hasher.update(memoryview(buffer)[:n])
+            return n
+
+    # newline=None: universal newlines, exactly as text-mode open() in _load_csv
+    return io.TextIOWrapper(io.BufferedReader(HashingReader(), _READ_CHUNK), encoding='utf-8', newline=None)
+
+
+def _scan_csv(filepath):
+    """Parse a CSV like _load_csv, also returning its header and a content hash"""
+    import csv
+    hasher = _ContentHash()
+    with open(filepath, 'rb') as f:
+        reader = csv.DictReader(_hashed_text(f, hasher))
+        rows = list(reader)
+    return reader.fieldnames or [], rows, hasher.hexdigest()
+
+
+def _ingest_csv(filepath, search_cols, columnar_path):
+    """Stream a CSV in one pass: cells go to a columnar file, search text to BM25.fit.
+
+    Neither rows nor documents are held in memory, only postings and the
+    columnar writer's cell offsets. Returns (bm25, source_hash), or None when
+    the columnar file cannot be written (read-only install).
+    """
+    import csv
+    hasher = _ContentHash()
+    with open(filepath, 'rb') as f:
+        reader = csv.DictReader(_hashed_text(f, hasher))
+        try:
+            writer = _ColumnarWriter(columnar_path, reader.fieldnames or [], None)
+        except OSError:
+            return None
+
+        def documents():
+            for row in reader:
+                writer.add(row)
+                yield " ".join(str(row.get(col, "")) for col in search_cols)
+
+        bm25 = BM25()
+        try:
+            bm25.fit(documents())
+        except OSError:
+            writer.discard()
+            return None
+    # The reader has consumed the file, so the hash covers exactly what was indexed
+    writer.source_hash = hasher.hexdigest()
+    try:
+        writer.close()
+    except OSError:
+        return None
+    return bm25, writer.source_hash
+
+
+def _hash_file(filepath):
+    hasher = _ContentHash()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# ============ ROW STORES ============
+class _ListRowStore:
+    """Rows already parsed into memory"""
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def project(self, idx, cols):
+        """Selected columns of one row (columns missing from the file are omitted)"""
+        row = self.rows[idx]
+        return {col: row.get(col, "") for col in cols if col in row}
+
+
+class _AppendedRowStore:
+    """A built row store plus rows appended to its data file since (see _append_rows)"""
+
+    __slots__ = ("base", "rows", "header", "source_hash")
+
+    def __init__(self, base, rows, header, source_hash):
+        self.base = base
+        self.rows = rows
+        self.header = header
+        self.source_hash = source_hash  # of the whole file, appended rows included
+
+    def __len__(self):
+        return len(self.base) + len(self.rows)
+
+    def project(self, idx, cols):
+        """Selected columns of one row, as the base store would return them"""
+        if idx < len(self.base):
+            return self.base.project(idx, cols)
+        row = self.rows[idx - len(self.base)]
+        return {col: row.get(col) for col in cols if col in self.header}
+
+
+# Columnar file layout (native byte order, recorded in the metadata):
+#   magic | meta length (Q) | marshal(meta) | pad to 8
+#   starts: ncols x nrows uint64 | lengths: ncols x nrows uint32 | pad to 8
+#   blob: UTF-8 cell bytes, written row by row
+# Cells are addressed per column, so fetching one output column of one row touches
+# only its offset slots and its bytes. A length of _NULL_CELL marks a missing cell
+# (DictReader's None for short rows).
+_COLUMNAR_MAGIC = b"BACOLS01"
+_NULL_CELL = 0xFFFFFFFF
+
+
+def _columnar_path(filepath):
+    """Location of the columnar row file for a CSV, e.g. index/stacks-go.cols"""
+    return _index_path(filepath).with_suffix(".cols")
+
+
+class _ColumnarWriter:
+    """Streams rows into a columnar file: cell bytes go straight to disk, only offsets stay in memory"""
+
+    def __init__(self, path, header, source_hash):
+        import tempfile
+        self.path = path
+        self.header = tuple(header)
+        self.source_hash = source_hash
+        self.nrows = 0
+        self.starts = [array('Q') for _ in self.header]
+        self.lengths = [array('I') for _ in self.header]
+        # The writer is the first thing to touch INDEX_DIR on a fresh install
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._blob = tempfile.TemporaryFile(dir=path.parent)
+        self._size = 0
+
+    def add(self, row):
+        for col, starts, lengths in zip(self.header, self.starts, self.lengths):
+            value = row.get(col)
+            starts.append(self._size)
+            if value is None:
+                lengths.append(_NULL_CELL)
+                continue
+            data = value.encode('utf-8')
+            self._blob.write(data)
+            self._size += len(data)
+            lengths.append(len(data))
+        self.nrows += 1
+
+    def discard(self):
+        """Abandon the file without writing it"""
+        self._blob.close()
+
+    def close(self):
+        """Assemble the final file atomically next to its destination"""
+        import shutil
+        meta = marshal.dumps({
+            "header": self.header,
+            "nrows": self.nrows,
+            "source_hash": self.source_hash,
+            "byteorder": sys.byteorder,
+        })
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(_COLUMNAR_MAGIC)
+                f.write(len(meta).to_bytes(8, sys.byteorder))
+                f.write(meta)
+                f.write(b"\0" * (-f.tell() % 8))
+                for starts in self.starts:
+                    starts.tofile(f)
+                for lengths in self.lengths:
+                    lengths.tofile(f)
+                f.write(b"\0" * (-f.tell() % 8))
+                self._blob.seek(0)
+                shutil.copyfileobj(self._blob, f)
+            os.replace(tmp, self.path)
+        finally:
+            self._blob.close()
+            if tmp.exists():
+                tmp.unlink()
+
+
+class _ColumnarRowStore:
+    """Memory-mapped columnar rows: cells are decoded from zero-copy slices on demand"""
+
+    __slots__ = ("path", "source_hash", "_mm", "header", "columns", "nrows", "starts", "lengths", "blob")
+
+    def __init__(self, path, source_hash, mm, header, nrows, starts, lengths, blob):
+        self.path = path
+        self.source_hash = source_hash
+        self._mm = mm
+        self.header = header
+        self.columns = {col: i for i, col in enumerate(header)}
+        self.nrows = nrows
+        self.starts = starts
+        self.lengths = lengths
+        self.blob = blob
+
+    @classmethod
+    def open(cls, path, source_hash):
+        """Map a columnar file if it exists and was built from this source content"""
+        import mmap
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(_COLUMNAR_MAGIC)) != _COLUMNAR_MAGIC:
+                    return None
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        view = memoryview(mm)
+        pos = len(_COLUMNAR_MAGIC)
+        try:
+            meta_len = int.from_bytes(view[pos:pos + 8], sys.byteorder)
+            meta = marshal.loads(view[pos + 8:pos + 8 + meta_len])
+        except (EOFError, ValueError, TypeError):
+            return None
+        if meta.get("source_hash") != source_hash or meta.get("byteorder") != sys.byteorder:
+            return None
+        header, nrows = meta["header"], meta["nrows"]
+        pos += 8 + meta_len
+        pos += -pos % 8
+        ncols = len(header)
+        starts_end = pos + 8 * ncols * nrows
+        lengths_end = starts_end + 4 * ncols * nrows
+        blob_start = lengths_end + (-lengths_end % 8)
+        if blob_start > len(view):
+            return None
+        starts = view[pos:starts_end].cast('Q')
+        lengths = view[starts_end:lengths_end].cast('I')
+        return cls(path, source_hash, mm, header, nrows, starts, lengths, view[blob_start:])
+
+    def __len__(self):
+        return self.nrows
+
+    def _cell(self, col_idx, idx):
+        slot = col_idx * self.nrows + idx
+        length = self.lengths[slot]
+        if length == _NULL_CELL:
+            return None
+        start = self.starts[slot]
+        return str(self.blob[start:start + length], 'utf-8')
+
+    def project(self, idx, cols):
+        """Selected columns of one row, decoding only those cells"""
+        columns = self.columns
+        return {col: self._cell(columns[col], idx) for col in cols if col in columns}
+
+
+# ============ INDEX REGISTRY ============
+_ENTRY_GENERATIONS = count(1)
+
+
+class _IndexEntry:
+    """Row store and fitted BM25 index for one CSV file"""
+
+    __slots__ = ("signature", "store", "bm25", "generation")
+
+    def __init__(self, signature, store, bm25):
+        self.signature = signature
+        self.store = store
+        self.bm25 = bm25
+        # Unique per build; cached results are only valid for the build that produced them
+        self.generation = next(_ENTRY_GENERATIONS)
+
+
+def _file_signature(filepath):
+    """Cheap change detector for a data file: (mtime_ns, size)"""
+    stat = filepath.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _data_relpath(filepath):
+    """Path of a data file relative to DATA_DIR (posix style), or None if outside it"""
+    try:
+        return Path(filepath).relative_to(DATA_DIR).as_posix()
+    except ValueError:
+        return None
+
+
+def _index_path(filepath):
+    """Location of the compiled index for a CSV, e.g. index/stacks-go.idx"""
+    filepath = Path(filepath)
+    rel = Path(_data_relpath(filepath) or filepath.name)
+    return INDEX_DIR / ("-".join(rel.with_suffix("").parts) + ".idx")
+
+
+def _write_index(path, payload):
+    """Atomically write a compiled index; read-only installs simply skip it"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'wb') as f:
+            # marshal: fastest stdlib loader; index files are local build artifacts
+            marshal.dump(payload, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _read_index(path, search_cols, source_hash):
+    """Load a compiled index if it matches the source CSV content and columns"""
+    try:
+        with open(path, 'rb') as f:
+            payload = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if (payload.get("version") != INDEX_FORMAT_VERSION
+            or payload.get("source_hash") != source_hash
+            or payload.get("search_cols") != tuple(search_cols)):
+        return None
+    return payload
+
+
+def _build_index(filepath, search_cols, signature):
+    """Load the compiled index for a CSV, recompiling it when the CSV content changed"""
+    index_path = _index_path(filepath)
+    columnar_path = _columnar_path(filepath)
+    source_hash = _hash_file(filepath)
+    payload = _read_index(index_path, search_cols, source_hash)
+    store = _ColumnarRowStore.open(columnar_path, source_hash) if payload is not None else None
+    if store is not None:
+        return _IndexEntry(signature, store, BM25.from_state(payload["bm25"]))
+
+    ingested = _ingest_csv(filepath, search_cols, columnar_path)
+    if ingested is not None:
+        bm25, source_hash = ingested
+        _write_index(index_path, {
+            "version": INDEX_FORMAT_VERSION,
+            "source_hash": source_hash,
+            "search_cols": tuple(search_cols),
+            "bm25": bm25.state(),
+        })
+        store = _ColumnarRowStore.open(columnar_path, source_hash)
+        if store is not None:
+            return _IndexEntry(signature, store, bm25)
+
+    # Read-only install: serve from rows parsed into memory
+    header, data, source_hash = _scan_csv(filepath)
 
     # Build documents from search columns
     documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
 
-    # BM25 search
     bm25 = BM25()
     bm25.fit(documents)
-    ranked = bm25.score(query)
+    return _IndexEntry(signature, _ListRowStore(data), bm25)
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
 
-    return results
+def _append_rows(entry, filepath, search_cols, signature):
+    """entry plus the rows appended to its CSV, or None unless the file only grew.
 
+    The old bytes must hash to the entry's source hash and end a line (or the
+    new bytes start one), so no earlier row can have changed. The new rows are added to a copy of the
+    index (compacted, so the published copy is never mutated by searches) and
+    served from an _AppendedRowStore; the on-disk index is rebuilt by the next
+    cold start as usual.
+    """
+    store = entry.store
+    source_hash = getattr(store, "source_hash", None)
+    if source_hash is None or not isinstance(entry.signature, tuple):
+        return None
+    old_size, new_size = entry.signature[1], signature[1]
+    if new_size <= old_size or len(store) != len(entry.bm25.doc_lengths):
+        return None
+    import csv
+    import io
+    hasher = _ContentHash()
+    with open(filepath, 'rb') as f:
+        remaining = old_size
+        last = b"\n" if old_size == 0 else b""
+        while remaining:
+            chunk = f.read(min(_READ_CHUNK, remaining))
+            if not chunk:
+                return None
+            hasher.update(chunk)
+            remaining -= len(chunk)
+            last = chunk
+        if hasher.hexdigest() != source_hash:
+            return None
+        # Exactly the bytes the signature covers: later growth is picked up by the next check
+        tail = f.read(new_size - old_size)
+    if len(tail) != new_size - old_size or not (last.endswith(b"\n") or tail.startswith((b"\n", b"\r"))):
+        return None
+    hasher.update(tail)
+    try:
+        text = io.TextIOWrapper(io.BytesIO(tail), encoding='utf-8', newline=None)
+        rows = tuple(csv.DictReader(text, fieldnames=store.header))
+    except (UnicodeDecodeError, csv.Error):
+        return None
 
-def detect_domain(query):
-    """Auto-detect the most relevant domain from query"""
-    query_lower = query.lower()
-
-    domain_keywords = {
-        "architecture": ["architecture", "microservices", "monolith", "serverless", "cqrs", "event-driven", "hexagonal", "clean", "layered", "modular"],
-        "database": ["database", "postgresql", "mysql", "mongodb", "redis", "cassandra", "clickhouse", "sql", "nosql", "vector", "timescale"],
-        "security": ["security", "owasp", "injection", "auth", "encryption", "vulnerability", "secrets", "container", "api security", "gdpr"],
-        "product": ["ecommerce", "saas", "fintech", "social", "chat", "iot", "marketplace", "booking", "crm", "analytics", "ai agent", "rag"],
-        "language": ["rust", "golang", "java", "python", "node", "typescript", "dotnet", "elixir", "php", "ruby", "c++", "framework"],
-        "api": ["rest", "graphql", "grpc", "websocket", "sse", "trpc", "mcp", "api", "endpoint", "http"],
-        "naming": ["naming", "convention", "variable", "function", "class", "table", "column", "camelcase", "snake_case"],
-        "db_design": ["schema", "modeling", "normalization", "index", "partitioning", "performance", "optimization", "query", "primary key", "foreign key", "uuid", "scale"],
-        "error": ["error", "exception", "status code", "http 4", "http 5", "grpc error", "handling", "retry"],
-        "platform": ["kubernetes", "terraform", "argocd", "vault", "observability", "gitops", "devops", "platform", "iac"]
-    }
+    bm25 = entry.bm25.copy()
+    for row in rows:
+        bm25.add(" ".join(str(row.get(col, "")) for col in search_cols))
+    bm25.compact()
+    if isinstance(store, _AppendedRowStore):
+        rows = store.rows + rows
+        store = store.base
+    return _IndexEntry(signature, _AppendedRowStore(store, rows, store.header, hasher.hexdigest()), bm25)
 
-    scores = {domain: sum(1 for kw in keywords if kw in query_lower) for domain, keywords in domain_keywords.items()}
-    best = max(scores, key=scores.get)
-    return best if scores[best] > 0 else "architecture"
 
+def _update_index(entry, filepath, search_cols, signature):
+    """Entry for a changed CSV: appended rows are added incrementally, other edits rebuild it"""
+    if entry is not None:
+        appended = _append_rows(entry, filepath, search_cols, signature)
+        if appended is not None:
+            return appended
+    return _build_index(filepath, search_cols, signature)
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
-    if domain is None:
-        domain = detect_domain(query)
 
-    config = CSV_CONFIG.get(domain, CSV_CONFIG["architecture"])
-    filepath = DATA_DIR / config["file"]
+def _get_index(filepath, search_cols):
+    """Index entry for a CSV from the default engine"""
+    return _DEFAULT_ENGINE.get_index(filepath, search_cols)
 
-    if not filepath.exists():
-        return {"error": f"File not found: {filepath}", "domain": domain}
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+def clear_index_registry():
+    """Drop all cached indexes (they are rebuilt lazily on next search)"""
+    _DEFAULT_ENGINE.clear()
 
-    return {
-        "domain": domain,
-        "query": query,
-        "file": config["file"],
-        "count": len(results),
-        "results": results
-    }
 
+def _index_targets():
+    """(data file, search columns) for every domain and stack"""
+    targets = [(config["file"], config["search_cols"]) for config in CSV_CONFIG.values()]
+    targets += [(config["file"], _STACK_COLS["search_cols"]) for config in STACK_CONFIG.values()]
+    return targets
 
-def search_stack(query, stack, max_results=MAX_RESULTS):
-    """Search stack-specific guidelines"""
-    if stack not in STACK_CONFIG:
-        return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
 
-    filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
+def build_indexes():
+    """Compile the on-disk index for every domain and stack file.
+
+    Returns {data file: index path}, with None for files whose index could not
+    be written (e.g. read-only install) and are served from in-memory rows.
+    """
+    built = {}
+    for filename, search_cols in _index_targets():
+        filepath = DATA_DIR / filename
+        if filepath.exists():
+            entry = _get_index(filepath, search_cols)
+            index_path = _index_path(filepath)
+            persisted = isinstance(entry.store, _ColumnarRowStore) and index_path.exists()
+            built[filename] = index_path if persisted else None
+    return built
+
 
+def index_stats():
+    """Size of the fitted index for every domain and stack file, keyed by data file"""
+    stats = {}
+    for filename, search_cols in _index_targets():
+        filepath = DATA_DIR / filename
+        if _source_exists(filepath):
+            stats[filename] = _get_index(filepath, search_cols).bm25.memory_usage()
+    return stats
+
+
+def load_rows(filename):
+    """All rows of a data file (path relative to DATA_DIR) as dicts, snapshot-aware"""
+    if _SNAPSHOT is not None and filename in _SNAPSHOT["files"]:
+        return list(_SNAPSHOT["files"][filename]["rows"])
+    filepath = DATA_DIR / filename
     if not filepath.exists():
-        return {"error": f"Stack file not found: {filepath}", "stack": stack}
+        return []
+    return _load_csv(filepath)
+
+
+def _source_exists(filepath):
+    """Whether a data file can be searched (on disk or in the loaded snapshot)"""
+    if _SNAPSHOT is not None and _data_relpath(filepath) in _SNAPSHOT["files"]:
+        return True
+    return filepath.exists()
+
+
+# ============ SHARED INDEX ============
+# Worker pools map one published, read-only file holding every fitted index
+# instead of each process loading its own copy. Rows already come from mmapped
+# columnar files, so a worker's private cost per index is its term dictionary.
+_SHARED_MAGIC = b"BASHRD01"
+
+
+class SharedIndex:
+    """A published shared-index file; close() removes it once workers have attached"""
+
+    def __init__(self, path, generations):
+        self.path = path
+        self.generations = generations  # index_generations() at publish time
 
-    results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
+    def close(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _shareable_entries():
+    """(data file, search columns, entry) for every index loaded from an on-disk data file"""
+    for filename, search_cols in _index_targets():
+        filepath = DATA_DIR / filename
+        if filepath.exists() and _snapshot_entry(filepath, search_cols) is None:
+            yield filename, search_cols, _get_index(filepath, search_cols)
+
+
+def index_generations():
+    """{data file: generation} of the current on-disk indexes; changes whenever one is rebuilt"""
+    return {filename: entry.generation for filename, _, entry in _shareable_entries()}
+
+
+def publish_shared_index():
+    """Write every on-disk domain and stack index into one file for attach_shared_index()"""
+    import tempfile
+    files = {}
+    generations = {}
+    chunks = []
+    size = 0
+    for filename, search_cols, entry in _shareable_entries():
+        generations[filename] = entry.generation
+        if not isinstance(entry.store, _ColumnarRowStore):
+            # Rows live only in this process; workers build that index themselves
+            continue
+        bm25 = entry.bm25
+        layout = {}
+        for name in _BM25_ARRAYS:
+            data = memoryview(getattr(bm25, name)).cast('B')
+            size += -size % 8
+            layout[name] = (size, len(data))
+            chunks.append((size, data))
+            size += len(data)
+        files[filename] = {
+            "search_cols": tuple(search_cols),
+            "signature": entry.signature,
+            "source_hash": entry.store.source_hash,
+            "k1": bm25.k1,
+            "b": bm25.b,
+            "N": bm25.N,
+            "avgdl": bm25.avgdl,
+            "terms": tuple(bm25.vocab),
+            "deleted": tuple(sorted(bm25.deleted)),
+            "arrays": layout,
+        }
+    meta = marshal.dumps({"version": INDEX_FORMAT_VERSION, "byteorder": sys.byteorder, "files": files})
+
+    # RAM-backed when available; any mmap-able file works
+    fd, path = tempfile.mkstemp(prefix="backend-architect-", suffix=".shidx",
+                                dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_SHARED_MAGIC)
+        f.write(len(meta).to_bytes(8, sys.byteorder))
+        f.write(meta)
+        f.write(b"\0" * (-f.tell() % 8))
+        base = f.tell()
+        for offset, data in chunks:
+            f.write(b"\0" * (base + offset - f.tell()))
+            f.write(data)
+    return SharedIndex(path, generations)
+
+
+def attach_shared_index(path, engine=None):
+    """Serve this process's searches from a published shared index; returns indexes attached.
+
+    Meant as a process-pool initializer. Entries keep the publisher's file
+    signature, so a data file edited after publishing is rebuilt locally as usual.
+    """
+    import mmap
+    with open(path, 'rb') as f:
+        if f.read(len(_SHARED_MAGIC)) != _SHARED_MAGIC:
+            raise ValueError(f"Not a shared index file: {path}")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    pos = len(_SHARED_MAGIC)
+    meta_len = int.from_bytes(view[pos:pos + 8], sys.byteorder)
+    meta = marshal.loads(view[pos + 8:pos + 8 + meta_len])
+    if meta.get("version") != INDEX_FORMAT_VERSION or meta.get("byteorder") != sys.byteorder:
+        raise ValueError(f"Incompatible shared index file: {path}")
+    base = pos + 8 + meta_len
+    base += -base % 8
+
+    entries = {}
+    for filename, item in meta["files"].items():
+        filepath = DATA_DIR / filename
+        store = _ColumnarRowStore.open(_columnar_path(filepath), item["source_hash"])
+        if store is None:
+            continue
+        buffers = {name: view[base + offset:base + offset + length]
+                   for name, (offset, length) in item["arrays"].items()}
+        entry = _IndexEntry(item["signature"], store, BM25.from_buffers(item, buffers))
+        entries[(str(filepath), item["search_cols"])] = entry
+    (engine or _DEFAULT_ENGINE).install(entries)
+    return len(entries)
+
+
+# ============ KNOWLEDGE SNAPSHOT ============
+# A single marshal blob holding every data file's rows and fitted index. Bundled
+# builds (see bundle.py) load it instead of reading CSVs from DATA_DIR.
+SNAPSHOT_FORMAT_VERSION = 2
+_SNAPSHOT = None
+_SNAPSHOT_ENTRIES = {}
+
+
+def export_snapshot():
+    """Serialize rows and fitted indexes for all domains and stacks into one blob"""
+    import hashlib
+    files = {}
+    for filename, search_cols in _index_targets():
+        filepath = DATA_DIR / filename
+        if not filepath.exists():
+            continue
+        _, rows, _ = _scan_csv(filepath)
+        documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in rows]
+        bm25 = BM25()
+        bm25.fit(documents)
+        files[filename] = {"search_cols": tuple(search_cols), "rows": tuple(rows), "bm25": bm25.state()}
+    body = marshal.dumps(files)
+    return marshal.dumps({
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "id": hashlib.sha256(body).hexdigest(),
+        "files": files,
+    })
+
+
+def load_snapshot(blob):
+    """Serve all searches from an export_snapshot() blob instead of DATA_DIR"""
+    global _SNAPSHOT
+    snapshot = marshal.loads(blob)
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError("Unsupported knowledge snapshot format")
+    _SNAPSHOT = snapshot
+    _SNAPSHOT_ENTRIES.clear()
+
+
+def snapshot_id():
+    """Content hash of the loaded snapshot, or None when reading from DATA_DIR"""
+    return _SNAPSHOT["id"] if _SNAPSHOT is not None else None
+
+
+def _snapshot_entry(filepath, search_cols):
+    """Index entry for a data file from the loaded snapshot, or None"""
+    if _SNAPSHOT is None:
+        return None
+    filename = _data_relpath(filepath)
+    item = _SNAPSHOT["files"].get(filename)
+    if item is None or item["search_cols"] != tuple(search_cols):
+        return None
+    entry = _SNAPSHOT_ENTRIES.get(filename)
+    if entry is None:
+        entry = _IndexEntry("snapshot", _ListRowStore(item["rows"]), BM25.from_state(item["bm25"]))
+        # Threads racing here must all end up sharing one entry (and its generation)
+        entry = _SNAPSHOT_ENTRIES.setdefault(filename, entry)
+    return entry
+
+
+# ============ RESULT CACHE ============
+class _ResultCache:
+    """Bounded cache with per-entry TTL and hit/miss counters.
+
+    Hits take no lock: get() is one dict lookup plus a flag write, and the
+    counters are plain increments, so they may undercount under free threading.
+    Eviction is CLOCK (second chance), an approximation of LRU: put() sweeps
+    entries oldest first and keeps those read since its last pass.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> [value, generation, expires, used]; written only under _lock
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        """Cached value for key if it is fresh and built from this index generation"""
+        item = self._data.get(key)
+        if item is not None and item[1] == generation and (item[2] is None or item[2] > time.monotonic()):
+            item[3] = True
+            self.hits += 1
+            return item[0]
+        # A stale item is left for put() to replace or the sweep to evict
+        self.misses += 1
+        return None
+
+    def put(self, key, generation, value):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            data = self._data
+            data.pop(key, None)
+            while len(data) >= self.maxsize:
+                oldest = next(iter(data))
+                item = data.pop(oldest)
+                if item[3]:
+                    item[3] = False
+                    data[oldest] = item  # second chance: back of the queue
+            data[key] = [value, generation, expires, False]
+
+    def clear(self):
+        with self._lock:
+            # Readers still holding the old dict finish their lookup against it
+            self._data = {}
+            self.hits = self.misses = 0
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data),
+                "maxsize": self.maxsize, "ttl": self.ttl}
+
+
+_RESULT_CACHE = _ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+
+def configure_result_cache(maxsize=None, ttl=None):
+    """Resize the result cache or change its TTL (seconds, 0 = no expiry)"""
+    if maxsize is not None:
+        _RESULT_CACHE.maxsize = maxsize
+    if ttl is not None:
+        _RESULT_CACHE.ttl = ttl
+    _RESULT_CACHE.clear()
+
+
+def result_cache_info():
+    """Hit/miss counters and current size of the result cache"""
+    return _RESULT_CACHE.info()
+
+
+def clear_result_cache():
+    _RESULT_CACHE.clear()
+
+
+# ============ UNIFIED INDEX ============
+class _UnifiedIndex:
+    """One BM25 index over every domain and stack file; doc ids map back to their source.
+
+    Built by merging the per-file indexes (no retokenizing), so scores are
+    comparable across files. Rebuilt whenever any per-file entry is replaced.
+    """
+
+    __slots__ = ("generations", "generation", "sources", "entries", "starts", "bm25")
+
+    def __init__(self, sources, entries):
+        self.generations = tuple(entry.generation for entry in entries)
+        self.generation = next(_ENTRY_GENERATIONS)
+        self.sources = sources  # (kind, name) per file: ("domain", "api"), ("stack", "go")
+        self.entries = entries
+        self.starts = []        # first unified doc id of each source
+        start = 0
+        for entry in entries:
+            self.starts.append(start)
+            start += len(entry.bm25.doc_lengths)
+        self.bm25 = BM25.merge([entry.bm25 for entry in entries])
+
+    def locate(self, doc_id):
+        """(source position, row id within that source's file) of a unified doc id"""
+        position = bisect_right(self.starts, doc_id) - 1
+        return position, doc_id - self.starts[position]
+
+
+class _DomainRouter:
+    """Term -> ((domain, weight), ...) table behind SearchEngine.route().
+
+    A term's weight in a domain is its largest BM25 contribution to any of that
+    domain's rows under the unified (cross-file) IDF, so summing the weights of
+    a query's tokens bounds the domain's best row score. Built from the unified
+    index and persisted to index/router.idx, so a cold process routes without
+    loading or merging the per-file indexes.
+    """
+
+    __slots__ = ("sources", "terms")
+
+    def __init__(self, sources, terms):
+        self.sources = sources  # {data file: (search cols, file signature)} it was built from
+        self.terms = terms
+
+    @classmethod
+    def build(cls, unified):
+        """Router over the AUTO_DOMAINS sources of a unified index"""
+        bm25 = unified.bm25
+        routable = {("domain", domain) for domain in AUTO_DOMAINS}
+        domains = [name if (kind, name) in routable else None for kind, name in unified.sources]
+        k1_plus = bm25.k1 + 1
+        terms = {}
+        for term, term_id in bm25.vocab.items():
+            idf = bm25.idf[term_id]
+            weights = {}
+            for i in range(bm25.term_ptr[term_id], bm25.term_ptr[term_id + 1]):
+                doc_id = bm25.post_docs[i]
+                domain = domains[bisect_right(unified.starts, doc_id) - 1]
+                if domain is None:
+                    continue
+                tf = bm25.post_tfs[i]
+                weight = idf * (tf * k1_plus) / (tf + bm25.norms[doc_id])
+                if weight > weights.get(domain, 0.0):
+                    weights[domain] = weight
+            if weights:
+                terms[term] = tuple(weights.items())
+        sources = {}
+        for (kind, name), entry in zip(unified.sources, unified.entries):
+            filename, search_cols = _target_source(kind, name)
+            sources[filename] = (tuple(search_cols), entry.signature)
+        return cls(sources, terms)
+
+    def current(self, sources):
+        """Whether this router was built from exactly these (data file -> signature) sources"""
+        return self.sources == sources
+
+    def rank(self, tokens):
+        """[(domain, score), ...] best first; ties keep AUTO_DOMAINS order"""
+        scores = {}
+        for token in tokens:
+            for domain, weight in self.terms.get(token, ()):
+                scores[domain] = scores.get(domain, 0.0) + weight
+        return sorted(scores.items(), key=lambda item: (-item[1], _AUTO_DOMAIN_ORDER[item[0]]))
+
+    def save(self, hashes):
+        """Persist next to the per-file indexes; hashes: {data file: content hash}"""
+        _write_index(_router_path(), {
+            "version": INDEX_FORMAT_VERSION,
+            "sources": {filename: (cols, signature, hashes[filename])
+                        for filename, (cols, signature) in self.sources.items()},
+            "terms": self.terms,
+        })
+
+    @classmethod
+    def load(cls, sources):
+        """The persisted router if it was built from these sources' current content, else None.
+
+        A source whose signature changed is checked against its content hash,
+        so touching a file without editing it does not force a rebuild.
+        """
+        try:
+            with open(_router_path(), 'rb') as f:
+                # loads() of the whole file: load() on a file object reads it piecemeal
+                payload = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(payload, dict) or payload.get("version") != INDEX_FORMAT_VERSION:
+            return None
+        saved = payload.get("sources")
+        if not isinstance(saved, dict) or saved.keys() != sources.keys():
+            return None
+        touched = False
+        for filename, (cols, signature) in sources.items():
+            saved_cols, saved_signature, saved_hash = saved[filename]
+            if saved_cols != cols:
+                return None
+            if saved_signature != signature:
+                if _hash_file(DATA_DIR / filename) != saved_hash:
+                    return None
+                touched = True
+        router = cls(sources, payload["terms"])
+        if touched:
+            router.save({filename: entry[2] for filename, entry in saved.items()})
+        return router
+
+
+_AUTO_DOMAIN_ORDER = {domain: rank for rank, domain in enumerate(AUTO_DOMAINS)}
+
+
+def _router_path():
+    return INDEX_DIR / "router.idx"
+
+
+def _router_sources():
+    """{data file: (search cols, file signature)} of every unified source, or None
+    when any is served from a loaded snapshot (nothing on disk to validate against)"""
+    sources = {}
+    for _, _, filename, search_cols, _ in _unified_targets():
+        filepath = DATA_DIR / filename
+        if _SNAPSHOT is not None and filename in _SNAPSHOT["files"]:
+            return None
+        try:
+            sources[filename] = (tuple(search_cols), _file_signature(filepath))
+        except FileNotFoundError:
+            continue
+    return sources
+
+
+def _target_source(kind, name):
+    """(data file, search columns) of a domain or stack"""
+    if kind == "domain":
+        return CSV_CONFIG[name]["file"], CSV_CONFIG[name]["search_cols"]
+    return STACK_CONFIG[name]["file"], _STACK_COLS["search_cols"]
+
+
+def _unified_targets():
+    """(kind, name, data file, search columns, output columns) for every domain and stack"""
+    targets = [("domain", domain, config["file"], config["search_cols"], config["output_cols"])
+               for domain, config in CSV_CONFIG.items()]
+    targets += [("stack", stack, config["file"], _STACK_COLS["search_cols"], _STACK_COLS["output_cols"])
+                for stack, config in STACK_CONFIG.items()]
+    return targets
+
+
+def _source_fields(kind, name):
+    """Leading fields naming where a cross-file result row came from"""
+    return {"domain": name} if kind == "domain" else {"domain": "stack", "stack": name}
+
+
+# ============ DOMAIN DETECTION ============
+# Keyword routing table for detect_domain(); a domain scores one hit per keyword
+# that occurs anywhere in the lowercased query
+DOMAIN_KEYWORDS = {
+    "architecture": ["architecture", "microservices", "monolith", "serverless", "cqrs", "event-driven", "hexagonal", "clean", "layered", "modular"],
+    "database": ["database", "postgresql", "mysql", "mongodb", "redis", "cassandra", "clickhouse", "sql", "nosql", "vector", "timescale"],
+    "security": ["security", "owasp", "injection", "auth", "encryption", "vulnerability", "secrets", "container", "api security", "gdpr"],
+    "product": ["ecommerce", "saas", "fintech", "social", "chat", "iot", "marketplace", "booking", "crm", "analytics", "ai agent", "rag"],
+    "language": ["rust", "golang", "java", "python", "node", "typescript", "dotnet", "elixir", "php", "ruby", "c++", "framework"],
+    "api": ["rest", "graphql", "grpc", "websocket", "sse", "trpc", "mcp", "api", "endpoint", "http"],
+    "naming": ["naming", "convention", "variable", "function", "class", "table", "column", "camelcase", "snake_case"],
+    "db_design": ["schema", "modeling", "normalization", "index", "partitioning", "performance", "optimization", "query", "primary key", "foreign key", "uuid", "scale"],
+    "error": ["error", "exception", "status code", "http 4", "http 5", "grpc error", "handling", "retry"],
+    "platform": ["kubernetes", "terraform", "argocd", "vault", "observability", "gitops", "devops", "platform", "iac"]
+}
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: every keyword occurring in a text, in one pass over it.
+
+    Fail links are folded into a full transition table, so scanning costs one
+    dict lookup per character.
+    """
+
+    __slots__ = ("delta", "outputs")
+
+    def __init__(self, keywords):
+        goto = [{}]           # trie: state -> {char: next state}
+        self.outputs = [()]   # state -> ids of keywords ending here (including via fail links)
+        for keyword_id, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = goto[state][char] = len(goto)
+                    goto.append({})
+                    self.outputs.append(())
+                state = nxt
+            self.outputs[state] += (keyword_id,)
+
+        # Breadth-first, so a state's fail target (a shallower state) is complete first:
+        # its transitions are the fail target's, overridden by its own trie edges
+        fail = [0] * len(goto)
+        self.delta = [None] * len(goto)
+        self.delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self.delta[state] = {**self.delta[fail[state]], **goto[state]}
+            for nxt in goto[state].values():
+                queue.append(nxt)
+            for char, nxt in goto[state].items():
+                fail[nxt] = self.delta[fail[state]].get(char, 0)
+                self.outputs[nxt] += self.outputs[fail[nxt]]
+
+    def find(self, text):
+        """Ids of the keywords that occur in text"""
+        delta, outputs = self.delta, self.outputs
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+_DOMAIN_MATCHER = None  # (automaton, keyword id -> domains), built on first use
+
+
+def _domain_matcher():
+    global _DOMAIN_MATCHER
+    if _DOMAIN_MATCHER is None:
+        keywords = {}
+        for domain, domain_keywords in DOMAIN_KEYWORDS.items():
+            for keyword in domain_keywords:
+                keywords.setdefault(keyword, []).append(domain)
+        _DOMAIN_MATCHER = (KeywordAutomaton(list(keywords)), list(keywords.values()))
+    return _DOMAIN_MATCHER
+
+
+def domain_hits(query):
+    """Keyword hits per domain for query, the best domain, and the routing confidence.
+
+    Confidence is the best domain's share of all hits (0.0 when nothing matched,
+    in which case the domain defaults to architecture); callers can fan out to
+    more domains when it is low.
+    """
+    automaton, keyword_domains = _domain_matcher()
+    hits = dict.fromkeys(DOMAIN_KEYWORDS, 0)
+    for keyword_id in automaton.find(query.lower()):
+        for domain in keyword_domains[keyword_id]:
+            hits[domain] += 1
+    best = max(hits, key=hits.get)
+    total = sum(hits.values())
     return {
-        "domain": "stack",
-        "stack": stack,
-        "query": query,
-        "file": STACK_CONFIG[stack]["file"],
-        "count": len(results),
-        "results": results
+        "domain": best if hits[best] > 0 else "architecture",
+        "hits": {domain: count for domain, count in hits.items() if count},
+        "confidence": hits[best] / total if total else 0.0
     }
+
+
+# ============ SEARCH ENGINE ============
+class SearchEngine:
+    """Thread-safe search over the knowledge base.
+
+    Loaded indexes form an immutable mapping that is replaced, never mutated, when
+    an index is (re)built, so searches read it without taking a lock. Entries are
+    read-only once published, and result cache hits are lock-free too: only index
+    builds and cache insertions after a miss serialize. The module-level search
+    functions delegate to a shared default engine.
+    """
+
+    def __init__(self, cache=None):
+        # (filepath, search_cols) -> _IndexEntry; swapped wholesale, never mutated
+        self._indexes = {}
+        # Serializes (re)builds so concurrent searches never compile the same index twice
+        self._build_lock = threading.Lock()
+        self.cache = cache if cache is not None else _ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+        # False while an IndexReloader owns freshness: loaded indexes are served
+        # without a per-query stat() until refresh() swaps in rebuilt ones
+        self.check_files = True
+        self._unified = None
+        self._router = None
+
+    def get_index(self, filepath, search_cols):
+        """Return the loaded index for a CSV, rebuilding it only when the file changed"""
+        snapshot_entry = _snapshot_entry(filepath, search_cols)
+        if snapshot_entry is not None:
+            return snapshot_entry
+        key = (str(filepath), tuple(search_cols))
+        entry = self._indexes.get(key)
+        if entry is not None and not self.check_files:
+            return entry
+        signature = _file_signature(filepath)
+        if entry is None or entry.signature != signature:
+            with self._build_lock:
+                entry = self._indexes.get(key)
+                if entry is None or entry.signature != signature:
+                    entry = _update_index(entry, filepath, search_cols, signature)
+                    self._publish({**self._indexes, key: entry})
+        return entry
+
+    def _publish(self, indexes):
+        """Make a new index mapping visible to readers in one reference assignment"""
+        self._indexes = indexes
+
+    def refresh(self):
+        """Rebuild loaded indexes whose data file changed and swap them in together.
+
+        Builds run without blocking searches, which keep using the old entries
+        (and finish on them if already in flight). The unified index and domain
+        router, if loaded, are rebuilt here too and swapped in with the entries.
+        Returns the rebuilt keys.
+        """
+        rebuilt = {}
+        for key, entry in self._indexes.items():
+            filepath = Path(key[0])
+            try:
+                signature = _file_signature(filepath)
+            except FileNotFoundError:
+                continue  # keep serving the last good index
+            if signature != entry.signature:
+                rebuilt[key] = _update_index(entry, filepath, key[1], signature)
+        if rebuilt:
+            unified = router = None
+            if self._unified is not None or self._router is not None:
+                unified = _UnifiedIndex(*self._unified_entries({**self._indexes, **rebuilt}))
+                if self._router is not None:
+                    router = self._build_router(unified)
+            with self._build_lock:
+                self._publish({**self._indexes, **rebuilt})
+                if unified is not None:
+                    self._unified = unified
+                if router is not None:
+                    self._router = router
+        return list(rebuilt)
+
+    def install(self, entries):
+        """Add prebuilt index entries keyed by (filepath, search_cols)"""
+        with self._build_lock:
+            self._publish({**self._indexes, **entries})
+
+    def clear(self):
+        """Drop all loaded indexes (they are rebuilt lazily on next search)"""
+        with self._build_lock:
+            self._publish({})
+            self._unified = None
+            self._router = None
+
+    def _unified_entries(self, indexes=None):
+        """(kind, name) and index entry of every source file, taken from indexes when present there"""
+        sources, entries = [], []
+        for kind, name, filename, search_cols, _ in _unified_targets():
+            filepath = DATA_DIR / filename
+            if _source_exists(filepath):
+                entry = indexes.get((str(filepath), tuple(search_cols))) if indexes else None
+                sources.append((kind, name))
+                entries.append(entry or self.get_index(filepath, search_cols))
+        return sources, entries
+
+    def unified_index(self):
+        """The cross-file index, rebuilt when any per-file index changed"""
+        sources, entries = self._unified_entries()
+        generations = tuple(entry.generation for entry in entries)
+        unified = self._unified
+        if unified is None or unified.generations != generations:
+            with self._build_lock:
+                unified = self._unified
+                if unified is None or unified.generations != generations:
+                    unified = _UnifiedIndex(sources, entries)
+                    self._unified = unified
+        return unified
+
+    @staticmethod
+    def _unified_hits(unified, query, sources=None):
+        """One scoring pass over the unified index: [(source position, row id, score)], best first"""
+        hits = []
+        for doc_id, score in unified.bm25.score(query):
+            position, row = unified.locate(doc_id)
+            if sources is None or unified.sources[position] in sources:
+                hits.append((position, row, score))
+        return hits
+
+    def search_all(self, query, max_results=MAX_RESULTS, per_source=False):
+        """Search every domain and stack file in one scoring pass.
+
+        Returns the best max_results rows overall or, with per_source=True, the
+        best max_results of each file that matched (files ordered by best hit).
+        Rows lead with the domain (and stack) they came from.
+        """
+        unified = self.unified_index()
+        key = ("all", tuple(unified.bm25.tokenize(query)), max_results, per_source)
+        cached = self.cache.get(key, unified.generation)
+        if cached is None:
+            cached = tuple(self._search_all(unified, query, max_results, per_source))
+            self.cache.put(key, unified.generation, cached)
+        results = [dict(row) for row in cached]
+        return {
+            "domain": "all",
+            "query": query,
+            "count": len(results),
+            "results": results
+        }
+
+    def _search_all(self, unified, query, max_results, per_source):
+        outputs = {(kind, name): output_cols for kind, name, _, _, output_cols in _unified_targets()}
+        hits = self._unified_hits(unified, query)
+        if per_source:
+            taken = Counter()
+            selected = []
+            for hit in hits:
+                if taken[hit[0]] < max_results:
+                    taken[hit[0]] += 1
+                    selected.append(hit)
+            # Group by source, sources in order of their best hit
+            first_seen = {}
+            for hit in selected:
+                first_seen.setdefault(hit[0], len(first_seen))
+            selected.sort(key=lambda hit: first_seen[hit[0]])
+        else:
+            selected = hits[:max_results]
+
+        results = []
+        for position, row, _ in selected:
+            kind, name = unified.sources[position]
+            fields = _source_fields(kind, name)
+            fields.update(unified.entries[position].store.project(row, outputs[(kind, name)]))
+            results.append(fields)
+        return results
+
+    def router(self):
+        """The domain router: in memory, else persisted on disk, else built from the unified index"""
+        router = self._router
+        if router is not None and not self.check_files:
+            return router
+        sources = _router_sources()
+        if router is not None and (sources is None or router.current(sources)):
+            return router
+        router = _DomainRouter.load(sources) if sources is not None else None
+        if router is None:
+            router = self._build_router(self.unified_index())
+        # Racing threads build equivalent routers, so the last one stored wins harmlessly
+        self._router = router
+        return router
+
+    @staticmethod
+    def _build_router(unified):
+        """Router over a unified index, persisted when every source is a file on disk"""
+        router = _DomainRouter.build(unified)
+        # Only columnar entries carry the content hash they were built from
+        hashes = {filename: getattr(entry.store, "source_hash", None)
+                  for filename, entry in zip(router.sources, unified.entries)}
+        if _SNAPSHOT is None and all(hashes.values()):
+            router.save(hashes)
+        return router
+
+    def route(self, query):
+        """Rank AUTO_DOMAINS for query in one pass over the router's term table.
+
+        Returns {"domains": [(domain, score), ...] best first, "confidence": c}
+        where c = 1 - runner-up / best (1.0 when one domain matches, 0.0 when none).
+        """
+        ranked = self.router().rank(BM25.tokenize(query))
+        if not ranked:
+            confidence = 0.0
+        elif len(ranked) == 1:
+            confidence = 1.0
+        else:
+            confidence = 1 - ranked[1][1] / ranked[0][1]
+        return {"domains": ranked, "confidence": confidence}
+
+    def _search_auto(self, query, max_results):
+        """Answer a domain-less query from the domain(s) the router ranks highest"""
+        routing = self.route(query)
+        ranked = [domain for domain, _ in routing["domains"]]
+        if not ranked:
+            # Nothing indexed matches; the keyword table still names a sensible domain
+            return self.search(query, detect_domain(query), max_results)
+        if len(ranked) == 1 or routing["confidence"] >= ROUTER_MIN_CONFIDENCE:
+            return self.search(query, ranked[0], max_results)
+        return self.search_domains(query, ranked[:2], max_results)
+
+    def search_domains(self, query, domains, max_results=MAX_RESULTS):
+        """Best rows across several domains, scored together in one unified pass"""
+        unified = self.unified_index()
+        key = ("domains", tuple(domains), tuple(unified.bm25.tokenize(query)), max_results)
+        cached = self.cache.get(key, unified.generation)
+        if cached is None:
+            sources = {("domain", domain) for domain in domains}
+            rows = []
+            for position, row, _ in self._unified_hits(unified, query, sources)[:max_results]:
+                domain = unified.sources[position][1]
+                fields = {"domain": domain}
+                fields.update(unified.entries[position].store.project(row, CSV_CONFIG[domain]["output_cols"]))
+                rows.append(fields)
+            cached = tuple(rows)
+            self.cache.put(key, unified.generation, cached)
+        results = [dict(row) for row in cached]
+        return {
+            "domain": ",".join(domains),
+            "query": query,
+            "file": ", ".join(CSV_CONFIG[domain]["file"] for domain in domains),
+            "count": len(results),
+            "results": results
+        }
+
+    def _search_csv(self, filepath, search_cols, output_cols, query, max_results):
+        """Core search function using BM25"""
+        if not _source_exists(filepath):
+            return []
+
+        entry = self.get_index(filepath, search_cols)
+
+        # Same tokens => same ranking, so the token tuple is the normalized query
+        key = (str(filepath), tuple(search_cols), tuple(output_cols),
+               tuple(entry.bm25.tokenize(query)), max_results)
+        cached = self.cache.get(key, entry.generation)
+        if cached is not None:
+            return [dict(row) for row in cached]
+
+        # BM25 search
+        ranked = entry.bm25.top_k(query, max_results)
+
+        # Get top results with score > 0
+        results = []
+        for idx, score in ranked:
+            if score > 0:
+                results.append(entry.store.project(idx, output_cols))
+
+        self.cache.put(key, entry.generation, tuple(dict(row) for row in results))
+        return results
+
+    def search(self, query, domain=None, max_results=MAX_RESULTS):
+        """Main search function; without a domain, the best-matching domain answers"""
+        if domain is None:
+            return self._search_auto(query, max_results)
+        if domain == "all":
+            return self.search_all(query, max_results)
+
+        config = CSV_CONFIG.get(domain, CSV_CONFIG["architecture"])
+        filepath = DATA_DIR / config["file"]
+
+        if not _source_exists(filepath):
+            return {"error": f"File not found: {filepath}", "domain": domain}
+
+        results = self._search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+
+        return {
+            "domain": domain,
+            "query": query,
+            "file": config["file"],
+            "count": len(results),
+            "results": results
+        }
+
+    def search_stacks(self, query, stacks=None, max_results=MAX_RESULTS):
+        """Search several stack files at once (all when stacks is None or "all").
+
+        stacks may also be a comma-separated string; a single stack name is
+        answered by search_stack().
+
+        Each stack's scores are divided by the query's upper bound in that
+        stack's index (the best score any of its rows could reach) and scaled by
+        the share of query tokens its vocabulary contains, giving comparable
+        relevance in [0, 1]. The merged top max_results are grouped by stack, stacks
+        ordered by their best row. Each stack's top_k is floored at the score
+        that could still enter the merged top k, so weak stacks stop early.
+        """
+        if isinstance(stacks, str) and stacks != "all":
+            stacks = [stack.strip() for stack in stacks.split(",") if stack.strip()]
+            if len(stacks) == 1:
+                return self.search_stack(query, stacks[0], max_results)
+        if stacks not in (None, "all"):
+            # In order, once each: a repeated stack would fill the top k with copies of its rows
+            stacks = list(dict.fromkeys(stacks))
+        label = "all" if stacks in (None, "all") else ",".join(stacks)
+        stacks = AVAILABLE_STACKS if stacks in (None, "all") else stacks
+        unknown = [stack for stack in stacks if stack not in STACK_CONFIG]
+        if unknown:
+            return {"error": f"Unknown stack: {', '.join(unknown)}. Available: {', '.join(AVAILABLE_STACKS)}"}
+
+        sources = []
+        for stack in stacks:
+            filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
+            if _source_exists(filepath):
+                sources.append((stack, self.get_index(filepath, _STACK_COLS["search_cols"])))
+        generations = tuple(entry.generation for _, entry in sources)
+        tokens = tuple(sources[0][1].bm25.tokenize(query)) if sources else ()
+        key = ("stacks", tuple(stacks), tokens, max_results)
+        cached = self.cache.get(key, generations)
+        if cached is None:
+            cached = tuple(self._search_stacks(sources, query, max_results))
+            self.cache.put(key, generations, cached)
+        results = [dict(row) for row in cached]
+
+        return {
+            "domain": "stack",
+            "stack": label,
+            "query": query,
+            "count": len(results),
+            "results": results
+        }
+
+    def _search_stacks(self, sources, query, max_results):
+        hits = []  # (-normalized score, stack position, row id)
+        for position, (stack, entry) in enumerate(sources):
+            bm25 = entry.bm25
+            bound = bm25.max_score(query)
+            if bound <= 0:
+                continue
+            tokens = bm25.tokenize(query)
+            scale = sum(1 for token in tokens if token in bm25.vocab) / len(tokens) / bound
+            floor = 0.0
+            if len(hits) >= max_results:
+                hits.sort()
+                del hits[max_results:]
+                # Slightly below the k-th normalized score: ties are settled by the final sort
+                floor = -hits[-1][0] / scale - _BOUND_EPSILON
+            for row, score in bm25.top_k(query, max_results, floor):
+                hits.append((-score * scale, position, row))
+        hits.sort()
+        hits = hits[:max_results]
+
+        # Group by stack, stacks in order of their best row
+        group = {}
+        for _, position, _ in hits:
+            group.setdefault(position, len(group))
+        hits.sort(key=lambda hit: group[hit[1]])
+
+        results = []
+        for negative, position, row in hits:
+            stack, entry = sources[position]
+            fields = {"stack": stack, "relevance": round(-negative, 4)}
+            fields.update(entry.store.project(row, _STACK_COLS["output_cols"]))
+            results.append(fields)
+        return results
+
+    def search_stack(self, query, stack, max_results=MAX_RESULTS):
+        """Search stack-specific guidelines ("all" or a list searches several stacks)"""
+        if stack == "all" or isinstance(stack, (list, tuple)):
+            return self.search_stacks(query, stack, max_results)
+        if stack not in STACK_CONFIG:
+            return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
+
+        filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
+
+        if not _source_exists(filepath):
+            return {"error": f"Stack file not found: {filepath}", "stack": stack}
+
+        results = self._search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
+
+        return {
+            "domain": "stack",
+            "stack": stack,
+            "query": query,
+            "file": STACK_CONFIG[stack]["file"],
+            "count": len(results),
+            "results": results
+        }
+
+
+_DEFAULT_ENGINE = SearchEngine(_RESULT_CACHE)
+
+
+def default_engine():
+    """The engine behind the module-level search functions"""
+    return _DEFAULT_ENGINE
+
+
+# ============ HOT RELOAD ============
+class IndexReloader:
+    """Background thread that polls an engine's data files and hot-swaps rebuilt indexes.
+
+    While it runs, searches skip per-query file checks; a changed file is rebuilt
+    on this thread and swapped in atomically, so queries never pay for the rebuild.
+    """
+
+    def __init__(self, engine=None, interval=RELOAD_INTERVAL, on_swap=None):
+        self.engine = engine or _DEFAULT_ENGINE
+        self.interval = interval
+        self.on_swap = on_swap  # called with the rebuilt keys after each swap
+        self.reloads = 0
+        self.last_swap = None     # wall-clock time of the last swap
+        self.last_latency = None  # seconds from starting the poll to the swap
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.engine.check_files = False
+        self._thread = threading.Thread(target=self._run, name="index-reloader", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.engine.check_files = True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Poll once; returns the rebuilt index keys"""
+        started = time.perf_counter()
+        try:
+            rebuilt = self.engine.refresh()
+        except Exception as e:
+            # e.g. a CSV caught mid-write: keep the old snapshot, retry next poll
+            self.last_error = f"{type(e).__name__}: {e}"
+            return []
+        if rebuilt:
+            self.reloads += 1
+            self.last_swap = time.time()
+            self.last_latency = time.perf_counter() - started
+            self.last_error = None
+            if self.on_swap is not None:
+                self.on_swap(rebuilt)
+        return rebuilt
+
+    def metrics(self):
+        """Reload count, last swap time (epoch seconds), last reload latency and error"""
+        return {
+            "reloads": self.reloads,
+            "last_swap": self.last_swap,
+            "last_reload_ms": None if self.last_latency is None else round(self.last_latency * 1000, 3),
+            "last_error": self.last_error,
+            "interval": self.interval,
+        }
+
+
+def detect_domain(query):
+    """Auto-detect the most relevant domain from query (keyword routing table)"""
+    return domain_hits(query)["domain"]
+
+
+def search(query, domain=None, max_results=MAX_RESULTS):
+    """Main search function; without a domain, the best-matching domain answers"""
+    return _DEFAULT_ENGINE.search(query, domain, max_results)
+
+
+def route(query):
+    """Domains ranked for query by the data-driven router (see SearchEngine.route)"""
+    return _DEFAULT_ENGINE.route(query)
+
+
+def search_all(query, max_results=MAX_RESULTS, per_source=False):
+    """Search every domain and stack file in one pass (see SearchEngine.search_all)"""
+    return _DEFAULT_ENGINE.search_all(query, max_results, per_source)
+
+
+def search_stack(query, stack, max_results=MAX_RESULTS):
+    """Search stack-specific guidelines ("all" or a list searches several stacks)"""
+    return _DEFAULT_ENGINE.search_stack(query, stack, max_results)
+
+
+def search_stacks(query, stacks=None, max_results=MAX_RESULTS):
+    """Merged, normalized search over several stacks (see SearchEngine.search_stacks)"""
+    return _DEFAULT_ENGINE.search_stacks(query, stacks, max_results)
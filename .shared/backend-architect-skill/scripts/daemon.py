@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend Architect Search Daemon - keeps indexes and the architecture generator warm
+behind a Unix domain socket so repeated CLI calls skip startup and index loading.
+
+Protocol: one JSON object per line in each direction.
+    {"op": "search", "query": "...", "domain": "api", "max_results": 3}
+    {"op": "search", "query": "...", "domain": "all", "per_source": true}
+    {"op": "stack", "query": "...", "stack": "go", "max_results": 3}
+    {"op": "stacks", "query": "...", "stacks": "all", "max_results": 3}   # or ["go", "rust"]
+    {"op": "architecture", "query": "...", "project_name": null, "format": "ascii",
+     "persist": false, "service": null, "output_dir": "/abs/path"}
+    {"op": "route", "query": "..."}   # ranked domains and routing confidence
+    {"op": "ping"}
+    {"op": "stats"}                    # hot-reload metrics and result cache counters
+Response: {"ok": true, "result": ...} or {"ok": false, "error": "..."}
+Requests are executed by handlers.handle_request, which also serves runs without a daemon.
+
+The socket and its lock live in a private 0700 directory ($XDG_RUNTIME_DIR/backend-architect,
+else backend-architect-<uid> under $TMPDIR or /tmp), and clients only talk to a daemon run by
+the same user.
+
+Edited data files are picked up by a background reloader (core.IndexReloader):
+new indexes are built off the request path and swapped in atomically.
+
+Usage:
+    python search.py --serve           # run in foreground
+    python search.py "<query>" ...     # uses (or auto-spawns) the daemon
+    BACKEND_ARCHITECT_DAEMON=0         # disable daemon use, always run in-process
+"""
+
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import handlers
+
+
+# ============ CONFIGURATION ============
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# What `python <target> --serve` runs; a bundled .pyz points this at itself
+SPAWN_TARGET = SCRIPTS_DIR / "search.py"
+IDLE_TIMEOUT = float(os.environ.get("BACKEND_ARCHITECT_DAEMON_IDLE", 900))
+CONNECT_TIMEOUT = 0.5
+REQUEST_TIMEOUT = 60.0
+SPAWN_WAIT = 5.0
+# Settings only the client reads; every other BACKEND_ARCHITECT_* variable shapes
+# the daemon's answers (engine, router, result cache, ...) and so keys its socket
+CLIENT_SETTINGS = {"BACKEND_ARCHITECT_DAEMON", "BACKEND_ARCHITECT_CACHE", "BACKEND_ARCHITECT_CACHE_MAX_BYTES"}
+
+
+def daemon_enabled() -> bool:
+    """Daemon use is on by default where Unix sockets exist; BACKEND_ARCHITECT_DAEMON=0 turns it off."""
+    return hasattr(socket, "AF_UNIX") and handlers.daemon_requested()
+
+
+def _uid() -> int:
+    return os.getuid() if hasattr(os, "getuid") else 0
+
+
+def runtime_dir() -> Path:
+    """Private per-user directory for the socket and its lock.
+
+    $XDG_RUNTIME_DIR/backend-architect, else backend-architect-<uid> in the temp
+    directory. Created 0700; refused (PermissionError) if it is a symlink, owned
+    by someone else or accessible to others, so no other user can plant or
+    answer on the socket.
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        path = Path(runtime) / "backend-architect"
+    else:
+        path = Path(os.environ.get("TMPDIR") or "/tmp") / f"backend-architect-{_uid()}"
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != _uid() or info.st_mode & 0o077:
+        raise PermissionError(f"unsafe daemon directory: {path}")
+    return path
+
+
+def socket_path() -> Path:
+    """Per-user socket path, keyed on the install location, script versions and settings.
+
+    Editing any script changes the key, so a daemon running old code is never reused;
+    a client with different BACKEND_ARCHITECT_* settings gets a daemon of its own.
+    """
+    # zlib instead of hashlib/tempfile: this runs on every client call and must stay cheap
+    key = str(SPAWN_TARGET)
+    if SCRIPTS_DIR.is_dir():
+        for script in sorted(os.listdir(SCRIPTS_DIR)):
+            if script.endswith(".py"):
+                key += f"|{script}:{os.stat(SCRIPTS_DIR / script).st_mtime_ns}"
+    else:
+        key += f"|{os.stat(SPAWN_TARGET).st_mtime_ns}"  # bundled: the archive is the version
+    for name in sorted(os.environ):
+        if name.startswith("BACKEND_ARCHITECT_") and name not in CLIENT_SETTINGS:
+            key += f"|{name}={os.environ[name]}"
+    data = key.encode("utf-8")
+    digest = f"{zlib.crc32(data):08x}{zlib.adler32(data):08x}"
+    return runtime_dir() / f"{digest}.sock"
+
+
+# ============ SERVER ============
+def serve(path: Path = None, idle_timeout: float = IDLE_TIMEOUT):
+    """Run the daemon until it has been idle for idle_timeout seconds."""
+    import signal
+    import socketserver
+    import threading
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        fcntl = None
+
+    path = Path(path or socket_path())
+    lock_path = Path(f"{path}.lock")
+    lock_fd = None
+    if fcntl is not None:
+        # O_NOFOLLOW: never write through a planted symlink
+        lock_fd = os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_NOFOLLOW | os.O_CLOEXEC, 0o600)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # A daemon shutting down unlinks its lock; only the file still at the path counts
+            if os.fstat(lock_fd).st_ino != os.stat(lock_path).st_ino:
+                raise FileNotFoundError(lock_path)
+        except OSError:
+            os.close(lock_fd)
+            return  # another daemon owns this socket
+    if path.exists():
+        path.unlink()
+
+    last_activity = [time.monotonic()]
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                last_activity[0] = time.monotonic()
+                try:
+                    response = {"ok": True, "result": handlers.handle_request(json.loads(line))}
+                except Exception as e:
+                    response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+                last_activity[0] = time.monotonic()
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    old_umask = os.umask(0o177)  # socket readable/writable by owner only
+    try:
+        server = Server(str(path), Handler)
+    finally:
+        os.umask(old_umask)
+
+    def watch_idle():
+        while time.monotonic() - last_activity[0] < idle_timeout:
+            time.sleep(min(5.0, idle_timeout))
+        server.shutdown()
+
+    # Clean up the socket file on `kill` as well as on idle shutdown
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        handlers.warm_up()
+        handlers.start_reloader()
+        threading.Thread(target=watch_idle, daemon=True).start()
+        server.serve_forever()
+    finally:
+        handlers.stop_reloader()
+        server.server_close()
+        if path.exists():
+            path.unlink()
+        if lock_fd is not None:
+            # Unlink while still holding the lock so no stale lock files pile up
+            lock_path.unlink(missing_ok=True)
+            os.close(lock_fd)
+
+
+# ============ CLIENT ============
+def _check_peer(sock: socket.socket, path: Path):
+    """Refuse to talk to a daemon run by another user."""
+    if hasattr(socket, "SO_PEERCRED"):
+        pid, uid, gid = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                                            struct.calcsize("3i")))
+    else:
+        uid = os.stat(path).st_uid
+    if uid != _uid():
+        raise PermissionError(f"daemon socket {path} belongs to uid {uid}")
+
+
+def _send(path: Path, request: dict, timeout: float):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(str(path))
+        _check_peer(sock, path)
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("daemon closed the connection")
+    return json.loads(line)
+
+
+def _spawn(path: Path):
+    """Start a detached daemon process for this install."""
+    import subprocess
+    subprocess.Popen(
+        [sys.executable, str(SPAWN_TARGET), "--serve"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        close_fds=True
+    )
+
+
+def call(request: dict, spawn: bool = True, timeout: float = REQUEST_TIMEOUT):
+    """Send a request to the daemon; returns the result, or None if no daemon could serve it."""
+    if not daemon_enabled():
+        return None
+    try:
+        path = socket_path()
+    except OSError:
+        return None  # no safe place for the socket: run in-process
+    try:
+        response = _send(path, request, timeout)
+    except (OSError, ValueError):
+        if not spawn:
+            return None
+        try:
+            _spawn(path)
+        except OSError:
+            return None
+        response = None
+        deadline = time.monotonic() + SPAWN_WAIT
+        while response is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+            try:
+                response = _send(path, request, timeout)
+            except (OSError, ValueError):
+                pass
+        if response is None:
+            return None
+    if not response.get("ok"):
+        return None
+    return response.get("result")
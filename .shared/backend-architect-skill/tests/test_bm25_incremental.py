@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental BM25 updates must rank exactly like a fresh fit of the live documents.
+Usage: python -m unittest discover -s .shared/backend-architect-skill/tests
+"""
+
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from core import BM25
+
+
+def fresh_ranking(docs, query):
+    """score() of a new index over the live documents, mapped back to their row ids"""
+    live = sorted(docs)
+    bm25 = BM25(engine="python")
+    bm25.fit([docs[doc_id] for doc_id in live])
+    return [(live[doc_id], score) for doc_id, score in bm25.score(query)]
+
+
+class IncrementalTopKTest(unittest.TestCase):
+    def test_delete_of_delta_only_document(self):
+        # Deleting the only pending document empties the delta, but IDF, norms
+        # and MaxScore bounds still describe the old corpus
+        bm25 = BM25(engine="python")
+        bm25.fit(["beta"])
+        bm25.top_k("beta", 1)
+        bm25.add("gamma")
+        bm25.top_k("beta", 1)
+        bm25.delete(1)
+        expected = fresh_ranking({0: "beta"}, "beta")
+        self.assertEqual(bm25.top_k("beta", 1), expected)
+        self.assertEqual(bm25.top_k_batch(["beta"], 1), [expected])
+
+    def test_random_updates_match_fresh_fit(self):
+        rng = random.Random(7)
+        words = [f"word{i}" for i in range(40)]
+
+        def text():
+            return " ".join(rng.choices(words, k=rng.randint(0, 10)))
+
+        docs = {doc_id: text() for doc_id in range(20)}
+        bm25 = BM25(engine="python")
+        bm25.fit([docs[doc_id] for doc_id in range(20)])
+        for _ in range(400):
+            op = rng.random()
+            if op < 0.4 or not docs:
+                value = text()
+                docs[bm25.add(value)] = value
+            elif op < 0.7:
+                doc_id = rng.choice(list(docs))
+                docs[doc_id] = text()
+                bm25.update(doc_id, docs[doc_id])
+            elif op < 0.9:
+                doc_id = rng.choice(list(docs))
+                del docs[doc_id]
+                bm25.delete(doc_id)
+            else:
+                bm25.compact()
+            # top_k before score(): the fast paths must not rely on score() refreshing first
+            query = " ".join(rng.choices(words, k=rng.randint(1, 3)))
+            k = rng.randint(1, 5)
+            expected = fresh_ranking(docs, query)
+            self.assertEqual(bm25.top_k(query, k), expected[:k], query)
+            self.assertEqual(bm25.score(query), expected, query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rows appended to a data file are indexed incrementally and rank exactly like a rebuild.
+Usage: python -m unittest discover -s .shared/backend-architect-skill/tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+import core
+
+QUERIES = ["redis cache", "postgres index", "queue retry", "zzappended row", "cache"]
+
+
+class AppendedRowsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.csv = Path(self.tmp.name) / "notes.csv"
+        self.csv.write_text("id,text\n"
+                            "n1,redis cache aside\n"
+                            "n2,postgres index tuning\n"
+                            "n3,queue retry with backoff", encoding="utf-8")  # no trailing newline
+        index_dir = core.INDEX_DIR
+        core.INDEX_DIR = Path(self.tmp.name) / "index"
+        self.addCleanup(setattr, core, "INDEX_DIR", index_dir)
+
+    def append(self, text):
+        with open(self.csv, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def assertMatchesRebuild(self, entry):
+        rebuilt = core._build_index(self.csv, ["text"], None)
+        self.assertEqual(len(entry.store), len(rebuilt.store))
+        for query in QUERIES:
+            self.assertEqual(entry.bm25.score(query), rebuilt.bm25.score(query), query)
+            self.assertEqual(entry.bm25.top_k(query, 2), rebuilt.bm25.top_k(query, 2), query)
+        for row in range(len(rebuilt.store)):
+            self.assertEqual(entry.store.project(row, ["id", "text"]), rebuilt.store.project(row, ["id", "text"]))
+
+    def test_appends_are_incremental(self):
+        engine = core.SearchEngine()
+        first = engine.get_index(self.csv, ["text"])
+        self.append("\nn4,redis cluster cache\n")
+        second = engine.get_index(self.csv, ["text"])
+        self.assertIsInstance(second.store, core._AppendedRowStore)
+        self.assertNotEqual(second.generation, first.generation)
+        self.assertMatchesRebuild(second)
+
+        self.append('n5,"zzappended row, quoted"\n\nn6,queue\n')
+        third = engine.get_index(self.csv, ["text"])
+        self.assertIsInstance(third.store, core._AppendedRowStore)
+        self.assertMatchesRebuild(third)
+
+    def test_other_edits_rebuild(self):
+        engine = core.SearchEngine()
+        engine.get_index(self.csv, ["text"])
+        self.append("n4,glued onto the last row\n")  # no leading newline: row n3 changed
+        entry = engine.get_index(self.csv, ["text"])
+        self.assertNotIsInstance(entry.store, core._AppendedRowStore)
+        self.assertMatchesRebuild(entry)
+
+
+if __name__ == "__main__":
+    unittest.main()
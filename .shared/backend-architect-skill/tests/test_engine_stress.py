@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stress test: many threads searching one SearchEngine while its indexes are
+dropped and refreshed must see exactly the single-threaded results.
+Usage: python -m unittest discover -s .shared/backend-architect-skill/tests
+       python .shared/backend-architect-skill/tests/test_engine_stress.py   # also prints throughput
+
+Runs under free-threaded CPython (3.13t+) too; there the throughput test also
+checks that searches scale with threads instead of serializing.
+BACKEND_ARCHITECT_STRESS_SECONDS sets how long each phase hammers the engine.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from core import SearchEngine
+
+SECONDS = float(os.environ.get("BACKEND_ARCHITECT_STRESS_SECONDS", "1.0"))
+
+QUERIES = ["rate limiting", "event sourcing", "postgres index", "jwt auth",
+           "kubernetes gitops", "retry backoff", "graphql schema", "payment saga"]
+
+# (method name, extra args): every read path of the engine
+CALLS = [
+    ("search", (None,)),
+    ("search", ("security",)),
+    ("search", ("database",)),
+    ("search", ("api",)),
+    ("search_all", ()),
+    ("search_stack", ("python",)),
+    ("search_stack", ("go",)),
+    ("search_stacks", ("all",)),
+]
+
+
+def gil_disabled():
+    """Whether this is a free-threaded interpreter running without the GIL"""
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_enabled is not None and not is_enabled()
+
+
+def hammer(engine, threads, seconds, expected=None, churn=False):
+    """Run random engine calls from `threads` threads; returns (calls made, mismatches)"""
+    stop = threading.Event()
+    counts, mismatches, failures = [], [], []
+
+    def reader(seed):
+        rng = random.Random(seed)
+        calls = 0
+        try:
+            while not stop.is_set():
+                query = rng.choice(QUERIES)
+                name, args = rng.choice(CALLS)
+                result = getattr(engine, name)(query, *args)
+                if expected is not None and result != expected[(query, name, args)]:
+                    mismatches.append((query, name, args))
+                calls += 1
+        except Exception as e:  # surfaced by the caller, not lost in the thread
+            failures.append(e)
+        counts.append(calls)
+
+    def churner():
+        # Readers must never observe a half-built or half-dropped index map
+        rng = random.Random(-1)
+        while not stop.is_set():
+            if rng.random() < 0.5:
+                engine.clear()
+            else:
+                engine.refresh()
+            time.sleep(0.002)
+
+    workers = [threading.Thread(target=reader, args=(seed,)) for seed in range(threads)]
+    if churn:
+        workers.append(threading.Thread(target=churner))
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    if failures:
+        raise failures[0]
+    return sum(counts), mismatches
+
+
+class SearchEngineStressTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        engine = SearchEngine()
+        cls.expected = {
+            (query, name, args): getattr(engine, name)(query, *args)
+            for query in QUERIES for name, args in CALLS
+        }
+
+    def test_concurrent_reads_with_clear_and_refresh(self):
+        engine = SearchEngine()
+        for threads in (2, 8, 32):
+            calls, mismatches = hammer(engine, threads, SECONDS / 3, self.expected, churn=True)
+            self.assertGreater(calls, 0)
+            self.assertEqual(mismatches, [], f"{threads} threads")
+
+    @unittest.skipUnless(gil_disabled() and (os.cpu_count() or 1) >= 4,
+                         "throughput scaling needs free-threaded CPython and 4+ cores")
+    def test_throughput_scales_without_gil(self):
+        engine = SearchEngine()
+        hammer(engine, 1, 0.2)  # load every index first
+        single, _ = hammer(engine, 1, SECONDS / 2)
+        parallel, _ = hammer(engine, 4, SECONDS / 2)
+        self.assertGreater(parallel, 1.5 * single)
+
+
+if __name__ == "__main__":
+    engine = SearchEngine()
+    hammer(engine, 1, 0.2)
+    print(f"GIL {'disabled' if gil_disabled() else 'enabled'}, {os.cpu_count()} cpus")
+    for threads in (1, 2, 4, 8, 16):
+        calls, _ = hammer(engine, threads, SECONDS)
+        print(f"{threads:>2} threads: {calls / SECONDS:,.0f} calls/s")
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend Architect Disk Cache - cross-process cache of search, stack and architecture
+system outputs in a local SQLite file, so warm repeats skip searching and formatting.
+
+Usage:
+    python search.py "<query>" --domain api --cache
+    BACKEND_ARCHITECT_CACHE=1                          # enable for every call
+    BACKEND_ARCHITECT_CACHE=/path/to/cache.sqlite3     # enable with a custom location
+
+Entries are keyed by normalized inputs plus a data-version hash of the knowledge
+files and scripts, so edits to either never serve stale output. The file is kept
+under BACKEND_ARCHITECT_CACHE_MAX_BYTES by evicting least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from core import DATA_DIR, snapshot_id
+
+
+# ============ CONFIGURATION ============
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_PATH = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "backend-architect" / "cache.sqlite3"
+MAX_BYTES = int(os.environ.get("BACKEND_ARCHITECT_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+BUSY_TIMEOUT = 5.0
+
+_ENABLED_VALUES = ("1", "true", "on", "yes")
+_DISABLED_VALUES = ("", "0", "false", "off", "no")
+
+
+def cache_path(enable: bool = False):
+    """Cache file to use, or None when the disk cache is off."""
+    value = os.environ.get("BACKEND_ARCHITECT_CACHE", "").strip()
+    if value.lower() in _DISABLED_VALUES:
+        return DEFAULT_PATH if enable else None
+    if value.lower() in _ENABLED_VALUES:
+        return DEFAULT_PATH
+    return Path(value).expanduser()
+
+
+def data_version() -> str:
+    """Hash of every knowledge file and script (name, mtime, size), or of the bundled snapshot."""
+    digest = hashlib.sha256()
+    if snapshot_id() is not None:
+        # Bundled build: the snapshot covers the data, the archive's mtime covers the code
+        digest.update(f"snapshot:{snapshot_id()}:{os.stat(sys.argv[0]).st_mtime_ns}\n".encode("utf-8"))
+    files = sorted(DATA_DIR.rglob("*.csv")) + sorted(SCRIPTS_DIR.glob("*.py"))
+    for path in files:
+        stat = path.stat()
+        digest.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ============ SQLITE CACHE ============
+class DiskCache:
+    """Best-effort key/value cache in SQLite (WAL mode, safe for concurrent processes).
+
+    Any SQLite error degrades to a cache miss; the cache never breaks a search.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+        except (sqlite3.Error, OSError):
+            return None
+
+    def put(self, key: str, value: str):
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                             (key, value, size, time.time()))
+                # Evict least recently used entries beyond the size budget
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS running"
+                    " FROM entries) WHERE running > ?)",
+                    (self.max_bytes,)
+                )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        except (sqlite3.Error, OSError):
+            pass
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def cache_key(kind: str, params: dict) -> str:
+    payload = json.dumps([kind, params, data_version()], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def request_params(request: dict) -> dict:
+    """Normalized cache inputs for a search.py request (see daemon.handle_request).
+
+    Searches tokenize lowercased text, so case and surrounding whitespace do not
+    change results. Architecture output also embeds project_name, which defaults
+    to the upper-cased query.
+    """
+    query = (request.get("query") or "").strip()
+    op = request.get("op", "search")
+    if op == "architecture":
+        return {"query": query.lower(), "project_name": request.get("project_name") or request.get("query", "").upper(),
+                "format": request.get("format", "ascii")}
+    return {"query": query.lower(), "domain": request.get("domain"), "stack": request.get("stack"),
+            "stacks": request.get("stacks"), "max_results": request.get("max_results"),
+            "per_source": request.get("per_source", False)}
+
+
+def cached_call(cache: DiskCache, kind: str, params: dict, compute):
+    """Return compute() through the cache; values must be JSON-serializable."""
+    key = cache_key(kind, params)
+    hit = cache.get(key)
+    if hit is not None:
+        return json.loads(hit)
+    value = compute()
+    cache.put(key, json.dumps(value, ensure_ascii=False))
+    return value
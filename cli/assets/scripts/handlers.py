@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend Architect Request Handlers - executes the daemon protocol's requests in-process.
+
+Shared by the daemon, batch mode and the in-process fallback of search.py. Only the
+stdlib modules every run needs are imported here; core and architecture_system are
+loaded by the ops that use them, and the socket side lives in daemon.py, which a run
+that never contacts the daemon does not import.
+"""
+
+import os
+
+
+_GENERATOR = None
+_RELOADER = None
+
+
+def daemon_requested() -> bool:
+    """BACKEND_ARCHITECT_DAEMON=0 (or false/off/no) turns daemon use off; it is on by default."""
+    return os.environ.get("BACKEND_ARCHITECT_DAEMON", "1").lower() not in ("0", "false", "off", "no")
+
+
+def handle_request(request: dict):
+    """Execute one request in-process; see daemon.py for the protocol."""
+    op = request.get("op", "search")
+    if op == "ping":
+        return "pong"
+    if op == "stats":
+        from core import result_cache_info
+        return {
+            "reloader": _RELOADER.metrics() if _RELOADER is not None else None,
+            "result_cache": result_cache_info()
+        }
+
+    from core import MAX_RESULTS, search, search_stack
+    query = request.get("query") or ""
+    max_results = request.get("max_results") or MAX_RESULTS
+    if op == "search":
+        if request.get("domain") == "all":
+            from core import search_all
+            return search_all(query, max_results, request.get("per_source", False))
+        return search(query, request.get("domain"), max_results)
+    if op == "stack":
+        return search_stack(query, request.get("stack"), max_results)
+    if op == "route":
+        from core import route
+        return route(query)
+    if op == "stacks":
+        from core import search_stacks
+        return search_stacks(query, request.get("stacks"), max_results)
+    if op == "architecture":
+        from architecture_system import generate_architecture_system
+        return generate_architecture_system(
+            query,
+            request.get("project_name"),
+            request.get("format", "ascii"),
+            persist=request.get("persist", False),
+            service=request.get("service"),
+            output_dir=request.get("output_dir"),
+            generator=_GENERATOR
+        )
+    raise ValueError(f"Unknown op: {op}")
+
+
+def warm_up():
+    """Load every compiled index and the reasoning rules before accepting traffic."""
+    global _GENERATOR
+    from core import build_indexes
+    from architecture_system import ArchitectureSystemGenerator
+    build_indexes()
+    _GENERATOR = ArchitectureSystemGenerator()
+
+
+def start_reloader():
+    """Hot-swap indexes when data files change; refresh the generator's reasoning rules too."""
+    global _RELOADER
+    from core import IndexReloader
+
+    def on_swap(rebuilt):
+        global _GENERATOR
+        from architecture_system import ArchitectureSystemGenerator
+        _GENERATOR = ArchitectureSystemGenerator()
+
+    _RELOADER = IndexReloader(on_swap=on_swap).start()
+
+
+def stop_reloader():
+    """Stop the reloader started by start_reloader(), if any."""
+    if _RELOADER is not None:
+        _RELOADER.stop()
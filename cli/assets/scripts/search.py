@@ -5,26 +5,66 @@ Backend Architect Skill Search - CLI for backend architecture knowledge base
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
        python search.py "<query>" --architecture-system [-p "Project Name"]
        python search.py "<query>" --architecture-system --persist [-p "Project Name"] [--service "payment"]
+       python search.py --build-index
+       python search.py --index-stats
+       python search.py --serve
+       python search.py --batch < queries.jsonl > results.jsonl
+       python search.py "<query>" [...] --cache
 
 Domains: architecture, database, security, product, language, api, naming, error, platform, backend-reasoning
+         all (every domain and stack file in one pass; add --per-source for the best of each)
+         Without --domain, a router built from the indexed vocabulary picks the domain
+         (or searches the top two together when the query is ambiguous).
 Stacks: go, python, node, java, dotnet, rust
+        all, or a comma-separated list (e.g. go,rust): merged top results grouped by stack,
+        ranked by a relevance score normalized per stack
 
 Architecture System Generation (NEW):
   --architecture-system    Generate complete backend architecture recommendation
   --persist                Save to architecture-system/MASTER.md
   --service                Create service-specific override file
+
+Compiled Indexes:
+  --build-index            Precompile BM25 indexes for all domains and stacks into index/
+                           (stale indexes are also rebuilt automatically on first query)
+  --index-stats            Report documents, terms, postings and bytes per document of each index
+
+Search Daemon:
+  --serve                  Keep indexes warm behind a Unix socket (auto-spawned by normal queries)
+  --no-daemon              Run in-process, never contact or spawn the daemon
+                           (BACKEND_ARCHITECT_DAEMON=0 does the same)
+
+Batch Mode:
+  --batch                  Read JSON-lines requests from stdin, stream JSON-lines results to stdout
+                           e.g. {"id": 1, "query": "rate limiting", "domain": "security", "max_results": 3}
+                                {"query": "orm", "stack": "python"}
+
+Disk Cache:
+  --cache                  Reuse outputs across processes via a local SQLite cache
+                           (BACKEND_ARCHITECT_CACHE=1 or =<path> enables it for every call)
+
+Diagnostics:
+  --timings                Report import / query / total time on stderr
+                           (pair with `python -X importtime` for a per-module breakdown)
 """
 
 import sys
-import io
+import time
+
+_STARTED = time.perf_counter()
 
 # Fix UnicodeEncodeError on Windows
 if sys.platform == 'win32':
+    import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
+# Keep top-level imports minimal: anything only one mode needs is imported in that branch
 import argparse
-from core import CSV_CONFIG, AVAILABLE_STACKS, AVAILABLE_DOMAINS, MAX_RESULTS, search, search_stack
-from architecture_system import generate_architecture_system, persist_architecture_system
+import os
+from core import AVAILABLE_STACKS, AVAILABLE_DOMAINS, MAX_RESULTS
+import handlers
+
+_IMPORTED = time.perf_counter()
 
 
 def format_output(result):
@@ -39,7 +79,10 @@ def format_output(result):
     else:
         output.append(f"## Backend Architect Search Results")
         output.append(f"**Domain:** {result['domain']} | **Query:** {result['query']}")
-    output.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
+    if result.get("file"):
+        output.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
+    else:
+        output.append(f"**Found:** {result['count']} results\n")
 
     for i, row in enumerate(result['results'], 1):
         output.append(f"### Result {i}")
@@ -53,11 +96,56 @@ def format_output(result):
     return "\n".join(output)
 
 
-if __name__ == "__main__":
+def stack_list(value):
+    """--stack value: one stack, "all", or a comma-separated list of stacks"""
+    if value == "all" or value in AVAILABLE_STACKS:
+        return value
+    stacks = list(dict.fromkeys(stack.strip() for stack in value.split(",") if stack.strip()))
+    unknown = [stack for stack in stacks if stack not in AVAILABLE_STACKS]
+    if not stacks or unknown:
+        raise argparse.ArgumentTypeError(
+            f"invalid stack: {', '.join(unknown) or value!r} (choose from {', '.join(AVAILABLE_STACKS)}, all)")
+    return stacks[0] if len(stacks) == 1 else stacks
+
+
+def report_timings(finished):
+    """Print startup and query cost to stderr (stdout stays machine-readable)"""
+    import_ms = (_IMPORTED - _STARTED) * 1000
+    run_ms = (finished - _IMPORTED) * 1000
+    print(f"[timings] imports: {import_ms:.1f} ms | query: {run_ms:.1f} ms | "
+          f"total: {import_ms + run_ms:.1f} ms | modules loaded: {len(sys.modules)}", file=sys.stderr)
+
+
+def run_batch(lines, out):
+    """Answer JSON-lines requests in-process, keeping indexes loaded across the batch"""
+    import json
+    for line in lines:
+        if not line.strip():
+            continue
+        request = {}
+        try:
+            request = json.loads(line)
+            if "op" not in request:
+                request["op"] = "stacks" if request.get("stacks") else "stack" if request.get("stack") else "search"
+            response = handlers.handle_request(request)
+            if not isinstance(response, dict):
+                response = {"result": response}
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        if isinstance(request, dict) and "id" in request:
+            response = {"id": request["id"], **response}
+        out.write(json.dumps(response, ensure_ascii=False) + "\n")
+        out.flush()
+
+
+def main():
     parser = argparse.ArgumentParser(description="Backend Architect Skill Search")
-    parser.add_argument("query", help="Search query")
-    parser.add_argument("--domain", "-d", choices=AVAILABLE_DOMAINS, help="Search domain")
-    parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search")
+    parser.add_argument("query", nargs="?", help="Search query")
+    parser.add_argument("--domain", "-d", choices=AVAILABLE_DOMAINS + ["all"], help="Search domain")
+    parser.add_argument("--per-source", action="store_true",
+                        help="With --domain all: best results from each domain and stack file")
+    parser.add_argument("--stack", "-s", type=stack_list,
+                        help="Stack-specific search: a stack, a comma-separated list, or all")
     parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
     
@@ -77,18 +165,101 @@ if __name__ == "__main__":
     parser.add_argument("--output-dir", "-o", type=str, default=None,
                         help="Output directory for persisted files")
 
+    # Compiled indexes
+    parser.add_argument("--build-index", action="store_true",
+                        help="Precompile search indexes for all domains and stacks")
+    parser.add_argument("--index-stats", action="store_true",
+                        help="Report in-memory index size per domain and stack")
+
+    # Search daemon
+    parser.add_argument("--serve", action="store_true",
+                        help="Run the search daemon in the foreground")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="Do not use or spawn the search daemon")
+
+    # Disk cache
+    parser.add_argument("--cache", action="store_true",
+                        help="Cache outputs across processes in a local SQLite file")
+
+    # Diagnostics
+    parser.add_argument("--timings", action="store_true",
+                        help="Report import and query timings on stderr")
+
+    # Batch mode
+    parser.add_argument("--batch", action="store_true",
+                        help="Read JSON-lines requests from stdin and write JSON-lines results")
+
     args = parser.parse_args()
 
+    if args.serve:
+        import daemon
+        daemon.serve()
+        return
+    if args.build_index:
+        from core import build_indexes, INDEX_DIR
+        for filename, path in build_indexes().items():
+            if path is None:
+                print(f"⚠️  {filename}: could not write its index to {INDEX_DIR}, "
+                      f"serving rows from memory", file=sys.stderr)
+            else:
+                print(f"✅ {path}")
+        return
+    if args.index_stats:
+        from core import index_stats
+        for filename, usage in index_stats().items():
+            print(f"{filename}: {usage['documents']} docs, {usage['terms']} terms, "
+                  f"{usage['postings']} postings, {usage['bytes']} bytes "
+                  f"({usage['bytes_per_doc']:.0f} bytes/doc)")
+        return
+    if args.batch:
+        run_batch(sys.stdin, sys.stdout)
+        return
+    if args.query is None:
+        parser.error("the following arguments are required: query")
+
     # Architecture system takes priority
     if args.architecture_system:
-        result = generate_architecture_system(
-            args.query,
-            args.project_name,
-            args.format,
-            persist=args.persist,
-            service=args.service,
-            output_dir=args.output_dir
-        )
+        request = {
+            "op": "architecture",
+            "query": args.query,
+            "project_name": args.project_name,
+            "format": args.format,
+            "persist": args.persist,
+            "service": args.service,
+            # Resolve here: the daemon's working directory is not ours
+            "output_dir": os.path.abspath(args.output_dir or os.getcwd())
+        }
+    elif args.stack in AVAILABLE_STACKS:
+        request = {"op": "stack", "query": args.query, "stack": args.stack, "max_results": args.max_results}
+    elif args.stack:
+        request = {"op": "stacks", "query": args.query, "stacks": args.stack, "max_results": args.max_results}
+    else:
+        request = {"op": "search", "query": args.query, "domain": args.domain, "max_results": args.max_results}
+        if args.per_source:
+            request["per_source"] = True
+
+    def execute():
+        result = None
+        if not args.no_daemon and handlers.daemon_requested():
+            import daemon  # sockets and JSON only for runs that may talk to the daemon
+            result = daemon.call(request)
+        return handlers.handle_request(request) if result is None else result
+
+    # Persisting writes files, so it always runs for real
+    cache_file = None
+    if args.cache or os.environ.get("BACKEND_ARCHITECT_CACHE"):
+        import disk_cache
+        cache_file = None if args.persist else disk_cache.cache_path(enable=args.cache)
+
+    if cache_file is None:
+        result = execute()
+    else:
+        result = disk_cache.cached_call(disk_cache.DiskCache(cache_file), request["op"],
+                                        disk_cache.request_params(request), execute)
+        if isinstance(result, dict) and "query" in result:
+            result["query"] = args.query
+
+    if args.architecture_system:
         print(result)
         
         # Print persistence confirmation
@@ -105,20 +276,16 @@ if __name__ == "__main__":
             print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.")
             print("=" * 60)
     
-    # Stack search
-    elif args.stack:
-        result = search_stack(args.query, args.stack, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-        else:
-            print(format_output(result))
-    
-    # Domain search
+    # Stack / domain search
+    elif args.json:
+        import json
+        print(json.dumps(result, indent=2, ensure_ascii=False))
     else:
-        result = search(args.query, args.domain, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-        else:
-            print(format_output(result))
+        print(format_output(result))
+
+    if args.timings:
+        report_timings(time.perf_counter())
+
+
+if __name__ == "__main__":
+    main()